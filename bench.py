@@ -0,0 +1,635 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+from xml.sax.saxutils import escape     # for writing the generated xml
+
+
+# Creates the xml representation of the program from the list of instructions.
+# Each instruction is a tuple of the opcode and a list of (type, value) arguments.
+def program_xml(instructions: list):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<program language="IPPcode22">']
+    order: int = 1
+    for opcode, args in instructions:
+        lines.append('<instruction order="' + str(order) + '" opcode="' + opcode + '">')
+        index: int = 1
+        for typ, value in args:
+            lines.append('<arg' + str(index) + ' type="' + typ + '">' + escape(value) + '</arg' + str(index) + '>')
+            index += 1
+        lines.append('</instruction>')
+        order += 1
+    lines.append('</program>')
+    return "\n".join(lines) + "\n"
+
+
+# Tight integer loop, returns the program, the number of executed instructions and the input.
+def gen_loop(size: int):
+    prog = [("DEFVAR", [("var", "GF@i")]),
+            ("DEFVAR", [("var", "GF@sum")]),
+            ("DEFVAR", [("var", "GF@tmp")]),
+            ("MOVE", [("var", "GF@i"), ("int", "0")]),
+            ("MOVE", [("var", "GF@sum"), ("int", "0")]),
+            ("LABEL", [("label", "loop")]),
+            ("ADD", [("var", "GF@sum"), ("var", "GF@sum"), ("var", "GF@i")]),
+            ("MUL", [("var", "GF@tmp"), ("var", "GF@i"), ("int", "3")]),
+            ("SUB", [("var", "GF@tmp"), ("var", "GF@tmp"), ("var", "GF@i")]),
+            ("LT", [("var", "GF@tmp"), ("var", "GF@tmp"), ("int", "100")]),
+            ("ADD", [("var", "GF@i"), ("var", "GF@i"), ("int", "1")]),
+            ("JUMPIFNEQ", [("label", "loop"), ("var", "GF@i"), ("int", str(size))]),
+            ("WRITE", [("var", "GF@sum")])]
+    return program_xml(prog), 6 + 7 * size, ""
+
+
+# Loop writing short strings and numbers to the output.
+def gen_write(size: int):
+    prog = [("DEFVAR", [("var", "GF@i")]),
+            ("MOVE", [("var", "GF@i"), ("int", "0")]),
+            ("LABEL", [("label", "loop")]),
+            ("WRITE", [("var", "GF@i")]),
+            ("WRITE", [("string", "\\032")]),
+            ("WRITE", [("bool", "true")]),
+            ("WRITE", [("string", "\\010")]),
+            ("ADD", [("var", "GF@i"), ("var", "GF@i"), ("int", "1")]),
+            ("JUMPIFNEQ", [("label", "loop"), ("var", "GF@i"), ("int", str(size))])]
+    return program_xml(prog), 2 + 7 * size, ""
+
+
+# Loop computing the sum of (i * i - 3 * i) / 2 with the values in the frame variables.
+def gen_expr_frame(size: int):
+    prog = [("DEFVAR", [("var", "GF@i")]),
+            ("DEFVAR", [("var", "GF@acc")]),
+            ("DEFVAR", [("var", "GF@t")]),
+            ("DEFVAR", [("var", "GF@u")]),
+            ("MOVE", [("var", "GF@i"), ("int", "0")]),
+            ("MOVE", [("var", "GF@acc"), ("int", "0")]),
+            ("LABEL", [("label", "loop")]),
+            ("MUL", [("var", "GF@t"), ("var", "GF@i"), ("var", "GF@i")]),
+            ("MUL", [("var", "GF@u"), ("var", "GF@i"), ("int", "3")]),
+            ("SUB", [("var", "GF@t"), ("var", "GF@t"), ("var", "GF@u")]),
+            ("IDIV", [("var", "GF@t"), ("var", "GF@t"), ("int", "2")]),
+            ("ADD", [("var", "GF@acc"), ("var", "GF@acc"), ("var", "GF@t")]),
+            ("ADD", [("var", "GF@i"), ("var", "GF@i"), ("int", "1")]),
+            ("JUMPIFNEQ", [("label", "loop"), ("var", "GF@i"), ("int", str(size))]),
+            ("WRITE", [("var", "GF@acc")])]
+    return program_xml(prog), 8 + 7 * size, ""
+
+
+# The same computation as gen_expr_frame with the intermediate values on the data stack.
+def gen_expr_stack(size: int):
+    prog = [("DEFVAR", [("var", "GF@i")]),
+            ("DEFVAR", [("var", "GF@acc")]),
+            ("MOVE", [("var", "GF@i"), ("int", "0")]),
+            ("MOVE", [("var", "GF@acc"), ("int", "0")]),
+            ("LABEL", [("label", "loop")]),
+            ("PUSHS", [("var", "GF@i")]),
+            ("PUSHS", [("var", "GF@i")]),
+            ("MULS", []),
+            ("PUSHS", [("var", "GF@i")]),
+            ("PUSHS", [("int", "3")]),
+            ("MULS", []),
+            ("SUBS", []),
+            ("PUSHS", [("int", "2")]),
+            ("IDIVS", []),
+            ("PUSHS", [("var", "GF@acc")]),
+            ("ADDS", []),
+            ("POPS", [("var", "GF@acc")]),
+            ("PUSHS", [("var", "GF@i")]),
+            ("PUSHS", [("int", "1")]),
+            ("ADDS", []),
+            ("POPS", [("var", "GF@i")]),
+            ("PUSHS", [("var", "GF@i")]),
+            ("PUSHS", [("int", str(size))]),
+            ("JUMPIFNEQS", [("label", "loop")]),
+            ("WRITE", [("var", "GF@acc")])]
+    return program_xml(prog), 6 + 19 * size, ""
+
+
+# Deep data stack, mostly for measuring the memory of the values on the stack. All the numbers are pushed
+# first, then they are popped and summed with a string pushed after each hundredth number.
+def gen_stack_fill(size: int):
+    prog = [("DEFVAR", [("var", "GF@i")]),
+            ("DEFVAR", [("var", "GF@v")]),
+            ("DEFVAR", [("var", "GF@r")]),
+            ("DEFVAR", [("var", "GF@sum")]),
+            ("MOVE", [("var", "GF@i"), ("int", "0")]),
+            ("MOVE", [("var", "GF@sum"), ("int", "0")]),
+            ("LABEL", [("label", "push")]),
+            ("PUSHS", [("var", "GF@i")]),
+            ("IDIV", [("var", "GF@r"), ("var", "GF@i"), ("int", "100")]),
+            ("MUL", [("var", "GF@r"), ("var", "GF@r"), ("int", "100")]),
+            ("JUMPIFNEQ", [("label", "next"), ("var", "GF@r"), ("var", "GF@i")]),
+            ("PUSHS", [("string", "mark")]),
+            ("LABEL", [("label", "next")]),
+            ("ADD", [("var", "GF@i"), ("var", "GF@i"), ("int", "1")]),
+            ("JUMPIFNEQ", [("label", "push"), ("var", "GF@i"), ("int", str(size))]),
+            ("LABEL", [("label", "pop")]),
+            ("POPS", [("var", "GF@v")]),
+            ("TYPE", [("var", "GF@r"), ("var", "GF@v")]),
+            ("JUMPIFNEQ", [("label", "pop"), ("var", "GF@r"), ("string", "int")]),
+            ("ADD", [("var", "GF@sum"), ("var", "GF@sum"), ("var", "GF@v")]),
+            ("JUMPIFNEQ", [("label", "pop"), ("var", "GF@v"), ("int", "0")]),
+            ("WRITE", [("var", "GF@sum")])]
+    marks: int = (size + 99) // 100
+    return program_xml(prog), 7 + 11 * size + 4 * marks, ""
+
+
+# Loop building a string by appending one character at a time, the length is checked in each iteration.
+def gen_concat(size: int):
+    prog = [("DEFVAR", [("var", "GF@s")]),
+            ("DEFVAR", [("var", "GF@n")]),
+            ("MOVE", [("var", "GF@s"), ("string", "")]),
+            ("LABEL", [("label", "loop")]),
+            ("CONCAT", [("var", "GF@s"), ("var", "GF@s"), ("string", "x")]),
+            ("STRLEN", [("var", "GF@n"), ("var", "GF@s")]),
+            ("JUMPIFNEQ", [("label", "loop"), ("var", "GF@n"), ("int", str(size))]),
+            ("WRITE", [("var", "GF@s")])]
+    return program_xml(prog), 5 + 3 * size, ""
+
+
+# Loop changing the characters of a long string in place, going through it over and over.
+def gen_setchar(size: int):
+    prog = [("DEFVAR", [("var", "GF@s")]),
+            ("DEFVAR", [("var", "GF@i")]),
+            ("DEFVAR", [("var", "GF@n")]),
+            ("DEFVAR", [("var", "GF@k")]),
+            ("MOVE", [("var", "GF@s"), ("string", "abcdefgh" * (size // 80 + 1))]),
+            ("STRLEN", [("var", "GF@n"), ("var", "GF@s")]),
+            ("MOVE", [("var", "GF@k"), ("int", "0")]),
+            ("LABEL", [("label", "loop")]),
+            ("IDIV", [("var", "GF@i"), ("var", "GF@k"), ("var", "GF@n")]),
+            ("MUL", [("var", "GF@i"), ("var", "GF@i"), ("var", "GF@n")]),
+            ("SUB", [("var", "GF@i"), ("var", "GF@k"), ("var", "GF@i")]),
+            ("SETCHAR", [("var", "GF@s"), ("var", "GF@i"), ("string", "z")]),
+            ("ADD", [("var", "GF@k"), ("var", "GF@k"), ("int", "1")]),
+            ("JUMPIFNEQ", [("label", "loop"), ("var", "GF@k"), ("int", str(size))]),
+            ("WRITE", [("var", "GF@s")])]
+    return program_xml(prog), 9 + 6 * size, ""
+
+
+# Loop calling a function with an argument in the temporary frame and the result on the data stack.
+def gen_call(size: int):
+    prog = [("JUMP", [("label", "main")]),
+            ("LABEL", [("label", "double")]),
+            ("DEFVAR", [("var", "LF@r")]),
+            ("ADD", [("var", "LF@r"), ("var", "LF@x"), ("var", "LF@x")]),
+            ("PUSHS", [("var", "LF@r")]),
+            ("RETURN", []),
+            ("LABEL", [("label", "main")]),
+            ("DEFVAR", [("var", "GF@i")]),
+            ("DEFVAR", [("var", "GF@sum")]),
+            ("DEFVAR", [("var", "GF@r")]),
+            ("MOVE", [("var", "GF@i"), ("int", "0")]),
+            ("MOVE", [("var", "GF@sum"), ("int", "0")]),
+            ("LABEL", [("label", "loop")]),
+            ("CREATEFRAME", []),
+            ("DEFVAR", [("var", "TF@x")]),
+            ("MOVE", [("var", "TF@x"), ("var", "GF@i")]),
+            ("PUSHFRAME", []),
+            ("CALL", [("label", "double")]),
+            ("POPFRAME", []),
+            ("POPS", [("var", "GF@r")]),
+            ("ADD", [("var", "GF@sum"), ("var", "GF@sum"), ("var", "GF@r")]),
+            ("ADD", [("var", "GF@i"), ("var", "GF@i"), ("int", "1")]),
+            ("JUMPIFNEQ", [("label", "loop"), ("var", "GF@i"), ("int", str(size))]),
+            ("WRITE", [("var", "GF@sum")])]
+    return program_xml(prog), 8 + 14 * size, ""
+
+
+# Recursive sum of the numbers down to zero, computed over and over with the recursion of the given depth.
+# Each level creates its frame with the argument and returns the result on the data stack.
+def gen_recursion(size: int, depth: int = 1000):
+    repeats: int = max(1, size // (10 * depth))
+    prog = [("JUMP", [("label", "main")]),
+            ("LABEL", [("label", "sum")]),
+            ("JUMPIFEQ", [("label", "base"), ("var", "LF@n"), ("int", "0")]),
+            ("CREATEFRAME", []),
+            ("DEFVAR", [("var", "TF@n")]),
+            ("SUB", [("var", "TF@n"), ("var", "LF@n"), ("int", "1")]),
+            ("PUSHFRAME", []),
+            ("CALL", [("label", "sum")]),
+            ("POPFRAME", []),
+            ("PUSHS", [("var", "LF@n")]),
+            ("ADDS", []),
+            ("RETURN", []),
+            ("LABEL", [("label", "base")]),
+            ("PUSHS", [("int", "0")]),
+            ("RETURN", []),
+            ("LABEL", [("label", "main")]),
+            ("DEFVAR", [("var", "GF@i")]),
+            ("DEFVAR", [("var", "GF@r")]),
+            ("MOVE", [("var", "GF@i"), ("int", "0")]),
+            ("LABEL", [("label", "loop")]),
+            ("CREATEFRAME", []),
+            ("DEFVAR", [("var", "TF@n")]),
+            ("MOVE", [("var", "TF@n"), ("int", str(depth))]),
+            ("PUSHFRAME", []),
+            ("CALL", [("label", "sum")]),
+            ("POPFRAME", []),
+            ("POPS", [("var", "GF@r")]),
+            ("ADD", [("var", "GF@i"), ("var", "GF@i"), ("int", "1")]),
+            ("JUMPIFNEQ", [("label", "loop"), ("var", "GF@i"), ("int", str(repeats))]),
+            ("WRITE", [("var", "GF@r")])]
+    return program_xml(prog), 6 + repeats * (12 + 10 * depth), ""
+
+
+# Loop copying a string character by character by GETCHAR and appending the characters by CONCAT.
+def gen_getchar(size: int):
+    prog = [("DEFVAR", [("var", "GF@s")]),
+            ("DEFVAR", [("var", "GF@r")]),
+            ("DEFVAR", [("var", "GF@c")]),
+            ("DEFVAR", [("var", "GF@i")]),
+            ("MOVE", [("var", "GF@s"), ("string", ("abcdefgh" * (size // 8 + 1))[:size])]),
+            ("MOVE", [("var", "GF@r"), ("string", "")]),
+            ("MOVE", [("var", "GF@i"), ("int", "0")]),
+            ("LABEL", [("label", "loop")]),
+            ("GETCHAR", [("var", "GF@c"), ("var", "GF@s"), ("var", "GF@i")]),
+            ("CONCAT", [("var", "GF@r"), ("var", "GF@r"), ("var", "GF@c")]),
+            ("ADD", [("var", "GF@i"), ("var", "GF@i"), ("int", "1")]),
+            ("JUMPIFNEQ", [("label", "loop"), ("var", "GF@i"), ("int", str(size))]),
+            ("WRITE", [("var", "GF@r")])]
+    return program_xml(prog), 9 + 4 * size, ""
+
+
+# Loop reading the input lines of all types until the end of the input.
+def gen_read(size: int):
+    prog = [("DEFVAR", [("var", "GF@n")]),
+            ("DEFVAR", [("var", "GF@s")]),
+            ("DEFVAR", [("var", "GF@b")]),
+            ("DEFVAR", [("var", "GF@t")]),
+            ("LABEL", [("label", "loop")]),
+            ("READ", [("var", "GF@n"), ("type", "int")]),
+            ("READ", [("var", "GF@s"), ("type", "string")]),
+            ("READ", [("var", "GF@b"), ("type", "bool")]),
+            ("TYPE", [("var", "GF@t"), ("var", "GF@n")]),
+            ("JUMPIFNEQ", [("label", "loop"), ("var", "GF@t"), ("string", "nil")])]
+    lines = list()
+    for x in range(size // 3):
+        lines.append(str(x * 7 - 1000))
+        lines.append("line\\032number\\032" + str(x))
+        lines.append("true" if x % 2 else "false")
+    return program_xml(prog), 4 + 5 * (size // 3 + 1), "\n".join(lines) + "\n"
+
+
+# Long straight program without loops, mostly for measuring the load of the program. Each jump goes
+# to the label of the next block, so all the instructions but the labels after the first one are executed.
+def gen_straight(size: int):
+    prog = [("DEFVAR", [("var", "GF@a")]),
+            ("DEFVAR", [("var", "GF@s")]),
+            ("MOVE", [("var", "GF@a"), ("int", "0")])]
+    for x in range(size // 4):
+        prog.append(("LABEL", [("label", "l" + str(x))]))
+        prog.append(("ADD", [("var", "GF@a"), ("var", "GF@a"), ("int", str(x))]))
+        prog.append(("MOVE", [("var", "GF@s"), ("string", "text\\032" + str(x))]))
+        prog.append(("JUMP", [("label", "l" + str(x + 1))]))
+    prog.append(("LABEL", [("label", "l" + str(size // 4))]))
+    prog.append(("WRITE", [("var", "GF@a")]))
+    return program_xml(prog), 5 + 3 * (size // 4), ""
+
+
+# name: (generator, default size)
+WORKLOADS = {
+    "loop": (gen_loop, 200000),
+    "write": (gen_write, 200000),
+    "call": (gen_call, 100000),
+    "recursion": (gen_recursion, 200000),
+    "expr-frame": (gen_expr_frame, 100000),
+    "expr-stack": (gen_expr_stack, 100000),
+    "stack-fill": (gen_stack_fill, 500000),
+    "concat": (gen_concat, 100000),
+    "setchar": (gen_setchar, 200000),
+    "getchar": (gen_getchar, 200000),
+    "read": (gen_read, 600000),
+    "load": (gen_straight, 200000),
+}
+# Allowed slowdown against the baseline, a relative change of the speed, the load time or the peak memory.
+BASELINE_TOLERANCE = 0.1
+
+# Budget of the start of the interpret in milliseconds: the run of an empty cached program above the start
+# of python itself. bench.py --startup fails when the start is slower.
+STARTUP_BUDGET = 70.0
+# Modules, which must not be imported by the run of an empty cached program.
+STARTUP_FORBIDDEN = ("xml.etree.ElementTree", "re", "json", "concurrent.futures")
+
+# Code of the child processes returning the peak memory of the process in kB. It is read from /proc, because
+# ru_maxrss of a child includes the memory of its parent at the fork, which holds the generated programs.
+PEAK_CODE = """
+def peak_memory():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+"""
+
+# Code of the child process running the interpret as the main script. The peak memory of the run, the time
+# spent by the garbage collector and the count of its collections are written to the file given as the first
+# argument. Collections are started by the allocations, so their count shows the allocation rate.
+RUN_CODE = PEAK_CODE + """
+import gc, sys, time, runpy
+collector = [0.0, 0, 0.0]               # time, collections, start of the running collection
+def measure_collection(phase, info):
+    if phase == "start":
+        collector[2] = time.perf_counter()
+    else:
+        collector[0] += time.perf_counter() - collector[2]
+        collector[1] += 1
+gc.callbacks.append(measure_collection)
+peak_file = sys.argv[1]
+sys.argv = sys.argv[2:]
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+finally:
+    with open(peak_file, "w") as file:
+        file.write("%d %f %d" % (peak_memory(), collector[0], collector[1]))
+"""
+
+# Code of the child process measuring the load of the program by the given loader of the interpret,
+# which is the module ipp_interpret beside the interpret.py launcher.
+LOAD_CODE = PEAK_CODE + """
+import sys, time
+sys.path.insert(0, sys.argv[1])
+import ipp_interpret
+start = time.perf_counter()
+with open(sys.argv[3], "rb") as file:
+    if sys.argv[2] == "dom":
+        prog = ipp_interpret.parse_xml(file.read())
+    elif sys.argv[2] == "stream":
+        prog = ipp_interpret.parse_xml_stream(file)
+    else:
+        prog = ipp_interpret.get_instruction_tree(sys.argv[3], False)
+print(time.perf_counter() - start, len(prog.instr_list), peak_memory())
+"""
+
+
+# Runs the interpret on the source file with the given input, returns the wall time of the best run,
+# the largest peak memory of the runs in kB and the garbage collector time and collections of the best run.
+# Each run has its own empty cache directory, so the program is always parsed and no user cache is touched.
+def measure(interpret: str, source: str, input_file: str, runs: int):
+    best: float = 0.0
+    peak: int = 0
+    collector = (0.0, 0)
+    peak_file: str = source + ".peak"
+    for x in range(runs):
+        env = dict(os.environ, IPP_CACHE_DIR=source + ".cache" + str(x))
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", RUN_CODE, peak_file, interpret, "--source=" + source,
+                                 "--input=" + input_file], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            sys.stderr.write(result.stderr.decode(errors="replace"))
+            sys.exit("Interpret " + interpret + " failed with " + str(result.returncode))
+        with open(peak_file) as file:
+            fields = file.read().split()
+        peak = max(peak, int(fields[0]))
+        if x == 0 or elapsed < best:
+            best = elapsed
+            collector = (float(fields[1]), int(fields[2]))
+    return best, peak, collector
+
+
+# Loads the program in a separate process, returns the load time and the peak memory of the process in kB.
+def measure_load(interpret: str, source: str, loader: str):
+    directory = os.path.dirname(os.path.abspath(interpret))
+    result = subprocess.run([sys.executable, "-c", LOAD_CODE, directory, loader, source],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr.decode(errors="replace"))
+        sys.exit("Loading by " + loader + " failed")
+    fields = result.stdout.split()
+    return float(fields[0]), int(fields[2])
+
+
+# Runs the command, returns the wall time of the best run in milliseconds.
+def measure_start(command: list, env: dict, runs: int):
+    best: float = 0.0
+    for x in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env)
+        elapsed = (time.perf_counter() - start) * 1000
+        if result.returncode != 0:
+            sys.stderr.write(result.stderr.decode(errors="replace"))
+            sys.exit(" ".join(command) + " failed with " + str(result.returncode))
+        if x == 0 or elapsed < best:
+            best = elapsed
+    return best
+
+
+# Runs the command with -X importtime, returns the cumulative import times in milliseconds
+# of the modules imported directly by the command, by their names.
+def import_times(command: list, env: dict):
+    result = subprocess.run([command[0], "-X", "importtime"] + command[1:], stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, env=env)
+    times = dict()
+    for line in result.stderr.decode(errors="replace").splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        name: str = fields[2].rstrip()
+        if fields[0].strip().isdigit() and len(name) - len(name.lstrip()) == 1:
+            times[name.strip()] = int(fields[1]) / 1000
+    return times
+
+
+# Measures the start of the interpret: the wall time of running an empty program taken from the cache
+# and parsed without it, compared with the start of python itself, and the modules imported by the run
+# of the cached program, which are not imported by python itself. The bytecode of the modules is kept
+# in a temporary directory. The start without it, as with -B or PYTHONDONTWRITEBYTECODE, and the time
+# of compiling the interpret module are reported too, they are not a part of the budget. Returns False
+# when the start exceeds the budget or imports a forbidden module.
+def bench_startup(interpret: str, runs: int, budget: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "empty.xml")
+        with open(source, "w") as file:
+            file.write(program_xml([]))
+        env = dict(os.environ, IPP_CACHE_DIR=os.path.join(tmp, "cache"),
+                   PYTHONPYCACHEPREFIX=os.path.join(tmp, "pycache"))
+        env.pop("PYTHONDONTWRITEBYTECODE", None)
+        no_bytecode = dict(env, PYTHONDONTWRITEBYTECODE="1", PYTHONPYCACHEPREFIX=os.path.join(tmp, "no-pycache"))
+        command = [sys.executable, interpret, "--source=" + source, "--input=" + os.devnull]
+        measure_start(command, env, 1)
+
+        python = measure_start([sys.executable, "-c", "pass"], env, runs)
+        cached = measure_start(command, env, runs)
+        parsed = measure_start(command + ["--no-cache"], env, runs)
+        uncompiled = measure_start(command, no_bytecode, runs)
+        module = os.path.join(os.path.dirname(os.path.abspath(interpret)), "ipp_interpret.py")
+        if not os.path.exists(module):
+            module = interpret
+        with open(module) as file:
+            text = file.read()
+        start = time.perf_counter()
+        compile(text, module, "exec")
+        compiling = (time.perf_counter() - start) * 1000
+        print("start python       %8.1f ms" % python)
+        print("start cached       %8.1f ms %+8.1f ms" % (cached, cached - python))
+        print("start no-cache     %8.1f ms %+8.1f ms" % (parsed, parsed - python))
+        print("start no-bytecode  %8.1f ms %+8.1f ms" % (uncompiled, uncompiled - python))
+        print("compile module     %8.1f ms" % compiling)
+
+        base = import_times([sys.executable, "-c", "pass"], env)
+        imported = {name: value for name, value in import_times(command, env).items() if name not in base}
+        for name, value in sorted(imported.items(), key=lambda item: -item[1]):
+            print("import %-30s %8.1f ms" % (name, value))
+
+    ok: bool = True
+    if cached - python > budget:
+        print("start exceeds the budget of %.1f ms" % budget)
+        ok = False
+    for name in STARTUP_FORBIDDEN:
+        if name in imported:
+            print("start imports " + name)
+            ok = False
+    return ok
+
+
+# Compares the results with the baseline written by --json before, returns False when any workload of the same
+# size got slower, its load got slower or its peak memory grew by more than the tolerance.
+def compare_baseline(results: dict, baseline_file: str, tolerance: float):
+    with open(baseline_file) as file:
+        baseline = json.load(file)["workloads"]
+    ok: bool = True
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None or base["size"] != result["size"]:
+            print("%-10s not in the baseline" % name)
+            continue
+        speed: float = result["instr_per_s"] / base["instr_per_s"]
+        load: float = result["load_time"] / base["load_time"]
+        memory: float = result["peak_kb"] / base["peak_kb"]
+        regressions = [what for what, bad in (("speed", speed < 1 - tolerance), ("load", load > 1 + tolerance),
+                                              ("memory", memory > 1 + tolerance)) if bad]
+        print("%-10s speed %5.2fx load %5.2fx memory %5.2fx %s" %
+              (name, speed, load, memory, " ".join("REGRESSION:" + what for what in regressions)))
+        ok = ok and not regressions
+    return ok
+
+
+# Compares the whole tree and the streaming xml loader of the interpret.
+def bench_load(interpret: str, size: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        xml, executed, data = gen_straight(size)
+        source = os.path.join(tmp, "load.xml")
+        with open(source, "w") as file:
+            file.write(xml)
+        for loader in ("dom", "stream"):
+            elapsed, peak = measure_load(interpret, source, loader)
+            print("load %-7s %10d instr %8.3f s %10d kB peak RSS" % (loader, size, elapsed, peak))
+
+
+# Measures the whole load of the program (parsing, validation, sorting, labels) for growing sizes,
+# the time per instruction should stay the same.
+def bench_scaling(interpret: str, max_size: int):
+    size: int = 1000
+    with tempfile.TemporaryDirectory() as tmp:
+        while size <= max_size:
+            xml, executed, data = gen_straight(size)
+            source = os.path.join(tmp, "load" + str(size) + ".xml")
+            with open(source, "w") as file:
+                file.write(xml)
+            elapsed, peak = measure_load(interpret, source, "full")
+            print("load %10d instr %8.3f s %8.2f us/instr %10d kB peak RSS" %
+                  (size, elapsed, elapsed / size * 1000000, peak))
+            os.remove(source)
+            size *= 10
+
+
+# Usage: bench.py [--interpret=file]... [--runs=N] [--size=N] [--json=file] [--baseline=file [--tolerance=X]]
+#                 [workload]...
+#        bench.py --startup [--interpret=file] [--runs=N] [--budget=MS]
+#        bench.py --load [--interpret=file] [--size=N]
+#        bench.py --load-scaling [--interpret=file] [--size=MAX]
+# More interprets can be given to compare their speed, default is interpret.py next to this script.
+# Each workload reports the executed instructions per second, the load time of the program, the peak
+# memory and the time and collections of the garbage collector. The results can be written as json by --json
+# and compared with such a file by --baseline, which fails when a workload regressed by more than the tolerance.
+def main():
+    interprets = list()
+    names = list()
+    runs: int = 0
+    size: int = 0
+    load: bool = False
+    scaling: bool = False
+    startup: bool = False
+    budget: float = STARTUP_BUDGET
+    json_file = None
+    baseline_file = None
+    tolerance: float = BASELINE_TOLERANCE
+    for arg in sys.argv[1:]:
+        if arg == "--load":
+            load = True
+        elif arg == "--startup":
+            startup = True
+        elif arg.startswith("--budget="):
+            budget = float(arg.partition("=")[2])
+        elif arg.startswith("--json="):
+            json_file = arg.partition("=")[2]
+        elif arg.startswith("--baseline="):
+            baseline_file = arg.partition("=")[2]
+        elif arg.startswith("--tolerance="):
+            tolerance = float(arg.partition("=")[2])
+        elif arg == "--load-scaling":
+            scaling = True
+        elif arg.startswith("--interpret="):
+            interprets.append(arg.partition("=")[2])
+        elif arg.startswith("--runs="):
+            runs = int(arg.partition("=")[2])
+        elif arg.startswith("--size="):
+            size = int(arg.partition("=")[2])
+        elif arg in WORKLOADS:
+            names.append(arg)
+        else:
+            sys.exit("Usage: bench.py [--startup|--load|--load-scaling] [--interpret=file]... [--runs=N] [--size=N] "
+                     "[--budget=MS] [--json=file] [--baseline=file] [--tolerance=X] [" +
+                     "|".join(WORKLOADS) + "]...")
+    if len(interprets) > 1 and (json_file or baseline_file):
+        sys.exit("Results of only one interpret can be written or compared with the baseline")
+    if len(interprets) == 0:
+        interprets.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "interpret.py"))
+    if startup:
+        sys.exit(0 if bench_startup(interprets[0], runs or 10, budget) else 1)
+    if load:
+        bench_load(interprets[0], size or 200000)
+        return
+    if scaling:
+        bench_scaling(interprets[0], size or 1000000)
+        return
+    if len(names) == 0:
+        names = list(WORKLOADS)
+
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            generator, default_size = WORKLOADS[name]
+            xml, executed, data = generator(size or default_size)
+            source = os.path.join(tmp, name + ".xml")
+            with open(source, "w") as file:
+                file.write(xml)
+            input_file = os.devnull
+            if data:
+                input_file = os.path.join(tmp, name + ".in")
+                with open(input_file, "w") as file:
+                    file.write(data)
+            for interpret in interprets:
+                elapsed, peak, collector = measure(interpret, source, input_file, runs or 3)
+                load_time = measure_load(interpret, source, "full")[0]
+                print("%-10s %-30s %10d instr %8.3f s %10.0f instr/s %8.3f s load %8d kB %7.3f s gc %6d collections" %
+                      (name, interpret, executed, elapsed, executed / elapsed, load_time, peak, *collector))
+                results[name] = {"size": size or default_size, "instructions": executed, "time": elapsed,
+                                 "instr_per_s": executed / elapsed, "load_time": load_time, "peak_kb": peak,
+                                 "gc_time": collector[0], "gc_collections": collector[1]}
+
+    if json_file:
+        with open(json_file, "w") as file:
+            json.dump({"python": sys.version.split()[0], "runs": runs or 3, "workloads": results}, file, indent=1)
+    if baseline_file and not compare_baseline(results, baseline_file, tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
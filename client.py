@@ -0,0 +1,144 @@
+import os
+import sys
+import socket
+import marshal                          # for the messages of the server
+
+# Size of the blocks in which the messages are received.
+RECEIVE_CHUNK = 1 << 16
+
+
+# Prints the error message to the stderr and exits the client with the given return value.
+def throw_error(message: str, number: int):
+    sys.stderr.write(message)
+    sys.exit(number)
+
+
+# Sends the message to the server, the format is the same as in interpret.py: python literals written
+# by marshal, preceded by their length in 4 bytes.
+def send_message(sock, message):
+    data: bytes = marshal.dumps(message)
+    sock.sendall(len(data).to_bytes(4, "big") + data)
+
+
+# Receives the message from the server, None is returned if the connection was closed.
+def receive_message(sock):
+    header: bytes = receive_exactly(sock, 4)
+    if header is None:
+        return None
+    data: bytes = receive_exactly(sock, int.from_bytes(header, "big"))
+    if data is None:
+        return None
+    return marshal.loads(data)
+
+
+def receive_exactly(sock, size: int):
+    parts = list()
+    while size > 0:
+        part: bytes = sock.recv(min(size, RECEIVE_CHUNK))
+        if not part:
+            return None
+        parts.append(part)
+        size -= len(part)
+    return b"".join(parts)
+
+
+# Parses the arguments, which are the same as of interpret.py, and creates the request for the server.
+# Files are sent by their absolute paths and read by the server, the standard input is sent whole.
+# Returns the path of the socket and the request.
+def parse_arguments():
+    socket_path = os.environ.get("IPP_SOCKET")
+    request = {"level": 1, "cache": True}
+    source = None
+    input_file = None
+    given = list()
+    args = sys.argv[1:]
+
+    if len(args) == 0:
+        throw_error("Wrong program arguments\n", 10)
+    if "--help" in args:
+        if len(args) != 1:
+            throw_error("Wrong program arguments\n", 10)
+        print("Usage: client.py [--socket=\"socket\"] [--input=\"filename\"] [--source=\"filename\"|--hash=\"hash\"]"
+              " [--no-cache] [-O0|-O1|-O2]")
+        print("\t client.py [--socket=\"socket\"] --metrics")
+        print("\t client.py [--help]")
+        print("Sends the program to the server started by interpret.py --serve and prints its output and exits\n"
+              "with its exit code, the arguments are the same as of interpret.py")
+        print("\t --socket  -  unix socket of the server, else the socket given by IPP_SOCKET")
+        print("\t --hash  -  runs the program from the compiled program cache of the server with the given hash")
+        print("\t --metrics  -  prints the request counts and latency histogram of the server")
+        sys.exit(0)
+
+    for arg in args:
+        name: str = arg.partition('=')[0]
+        if name.startswith("-O"):
+            name = "-O"
+        if name in given:
+            throw_error("Wrong program arguments\n", 10)
+        given.append(name)
+
+        if arg.startswith("--socket=") and arg.partition('=')[2] != "":
+            socket_path = arg.partition('=')[2]
+        elif arg.startswith("--source="):
+            source = arg.partition('=')[2]
+        elif arg.startswith("--hash=") and arg.partition('=')[2] != "":
+            request["hash"] = arg.partition('=')[2]
+        elif arg.startswith("--input="):
+            input_file = arg.partition('=')[2]
+        elif arg == "--no-cache":
+            request["cache"] = False
+        elif arg in ("-O0", "-O1", "-O2"):
+            request["level"] = int(arg[2:])
+        elif arg == "--metrics":
+            request["metrics"] = True
+        else:
+            throw_error("Wrong program arguments\n", 10)
+
+    if socket_path is None:
+        throw_error("Wrong program arguments\n", 10)
+    if "metrics" in request:
+        if len(given) != 1 + ("--socket" in given):
+            throw_error("Wrong program arguments\n", 10)
+        return socket_path, {"metrics": True}
+    if source is not None and "hash" in request:
+        throw_error("Wrong program arguments\n", 10)
+    if source is None and "hash" not in request and input_file is None:
+        throw_error("Wrong program arguments\n", 10)
+
+    if source is not None:
+        request["path"] = os.path.abspath(source)
+    elif "hash" not in request:
+        request["source"] = sys.stdin.buffer.read()
+    if input_file is not None:
+        request["input_path"] = os.path.abspath(input_file)
+    else:
+        request["input"] = sys.stdin.buffer.read()
+    return socket_path, request
+
+
+# Usage: client.py [--socket=socket] [--input=filename] [--source=filename|--hash=hash] [--no-cache] [-O0|-O1|-O2]
+#        client.py [--socket=socket] --metrics
+#        client.py [--help]
+def main():
+    socket_path, request = parse_arguments()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+            send_message(sock, request)
+            response = receive_message(sock)
+    except OSError:
+        throw_error("Couldn't connect to the server\n", 99)
+    if response is None:
+        throw_error("Connection to the server was closed\n", 99)
+
+    if "metrics" in response:
+        sys.stdout.write(response["metrics"])
+        sys.exit(0)
+    sys.stdout.buffer.write(response["stdout"])
+    sys.stdout.buffer.flush()
+    sys.stderr.buffer.write(response["stderr"])
+    sys.exit(response["code"])
+
+
+if __name__ == '__main__':
+    main()
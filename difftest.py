@@ -0,0 +1,271 @@
+import os
+import sys
+import random
+import tempfile
+import subprocess
+from bench import program_xml           # for writing the generated programs
+
+# Variables of the generated programs by their type, all of them are initialized at the start.
+INT_VARS = ("GF@i0", "GF@i1", "GF@i2")
+STRING_VARS = ("GF@s0", "GF@s1")
+BOOL_VARS = ("GF@b0", "GF@b1")
+# Time limit of one run of the interpret in seconds.
+TIMEOUT = 30
+
+
+# Runs the interpret with the given options, returns its exit code, stdout and stderr.
+# With the option --compiled, the program is compiled by --compile to an empty cache first and run
+# from the compiled module, a failure of the compilation is the result.
+def run(interpret: str, source: str, input_file: str, options: list):
+    if "--compiled" in options:
+        options = [option for option in options if option != "--compiled"]
+        with tempfile.TemporaryDirectory() as cache:
+            env = dict(os.environ, IPP_CACHE_DIR=cache)
+            result = execute([interpret, "--source=" + source, "--compile"] + options, env)
+            if result[0] != 0:
+                return result
+            return execute([interpret, "--source=" + source, "--input=" + input_file] + options, env)
+    return execute([interpret, "--source=" + source, "--input=" + input_file, "--no-cache"] + options, None)
+
+
+def execute(args: list, env):
+    try:
+        result = subprocess.run([sys.executable] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                timeout=TIMEOUT, env=env)
+    except subprocess.TimeoutExpired:
+        return "timeout", b"", b""
+    return result.returncode, result.stdout, result.stderr
+
+
+# Runs the source with each of the option sets and compares the results with the first one.
+# Returns the description of the first difference, an empty string if all the runs are the same.
+def compare(interpret: str, source: str, input_file: str, variants: list):
+    expected = run(interpret, source, input_file, variants[0])
+    for options in variants[1:]:
+        result = run(interpret, source, input_file, options)
+        for name, first, second in zip(("exit code", "stdout", "stderr"), expected, result):
+            if first != second:
+                return "%s differs between %s and %s:\n  %r\n  %r" % \
+                       (name, " ".join(variants[0]), " ".join(options), first, second)
+    return ""
+
+
+# Returns a random operand of the given type, sometimes of a wrong type or an uninitialized variable,
+# so the error codes are compared too.
+def operand(rand: random.Random, typ: str):
+    if rand.random() < 0.003:
+        typ = rand.choice(("int", "string", "bool", "nil", "undef"))
+    if typ == "undef":
+        return "var", "GF@u"
+    if typ == "nil":
+        return "nil", "nil"
+    if rand.random() < 0.5:
+        if typ == "int":
+            return "var", rand.choice(INT_VARS)
+        elif typ == "string":
+            return "var", rand.choice(STRING_VARS)
+        return "var", rand.choice(BOOL_VARS)
+    if typ == "int":
+        return "int", str(rand.randint(-5, 20))
+    elif typ == "string":
+        return "string", rand.choice(("", "a", "b\\032c", "xyz"))
+    return "bool", rand.choice(("true", "false"))
+
+
+# Returns a random conditional jump to one of the labels.
+def conditional_jump(rand: random.Random, labels: list):
+    typ: str = rand.choice(("int", "string", "bool", "nil"))
+    return rand.choice(("JUMPIFEQ", "JUMPIFNEQ")), [("label", rand.choice(labels)), operand(rand, typ),
+                                                    operand(rand, typ)]
+
+
+# Returns a random computation on the data stack with the instructions of the STACK extension.
+def stack_expression(rand: random.Random, labels: list):
+    code: str = rand.choice(("ADDS", "SUBS", "MULS", "IDIVS", "LTS", "GTS", "EQS", "ANDS", "ORS", "NOTS",
+                             "INT2CHARS", "STRI2INTS", "JUMPIFEQS", "JUMPIFNEQS", "CLEARS"))
+    if code in ("ADDS", "SUBS", "MULS", "IDIVS"):
+        types, result = ("int", "int"), INT_VARS
+    elif code in ("LTS", "GTS", "EQS"):
+        typ: str = rand.choice(("int", "string", "bool"))
+        types, result = (typ, typ), BOOL_VARS
+    elif code in ("ANDS", "ORS"):
+        types, result = ("bool", "bool"), BOOL_VARS
+    elif code == "NOTS":
+        types, result = ("bool",), BOOL_VARS
+    elif code == "INT2CHARS":
+        types, result = ("int",), STRING_VARS
+    elif code == "STRI2INTS":
+        types, result = ("string", "int"), INT_VARS
+    else:
+        types, result = ("int", "int"), ()
+    prog = [("PUSHS", [operand(rand, typ)]) for typ in types]
+    if code.startswith("JUMPIF"):
+        prog.append((code, [("label", rand.choice(labels))]))
+    else:
+        prog.append((code, []))
+    if len(result) != 0 and code != "CLEARS":
+        prog.append(("POPS", [("var", rand.choice(result))]))
+    return prog
+
+
+# Generates a random program, which always ends. Jumps go only forward. In a few programs some of them go
+# to undefined labels, such programs end by the error before the execution.
+# Functions called by the program are at its start, they write and change their argument.
+def random_program(rand: random.Random, size: int):
+    labels = ["L" + str(x) for x in range(size // 4 + 1)]
+    places = sorted(rand.sample(range(size), len(labels)))
+    prog = [("JUMP", [("label", "main")])]
+    for name in ("f0", "f1"):
+        prog.append(("LABEL", [("label", name)]))
+        prog.append(("WRITE", [("var", "LF@a")]))
+        prog.append(("ADD", [("var", "LF@a"), ("var", "LF@a"), ("int", "1")]))
+        prog.append(("PUSHS", [("var", "LF@a")]))
+        prog.append(("RETURN", []))
+    prog.append(("LABEL", [("label", "main")]))
+    prog.append(("DEFVAR", [("var", "GF@u")]))
+    for name, value in [(var, ("int", "1")) for var in INT_VARS] + [(var, ("string", "s")) for var in STRING_VARS] + \
+                       [(var, ("bool", "true")) for var in BOOL_VARS]:
+        prog.append(("DEFVAR", [("var", name)]))
+        prog.append(("MOVE", [("var", name), value]))
+
+    undefined: float = 0.05 if rand.random() < 0.1 else 0.0
+    next_label: int = 0
+    for position in range(size):
+        while next_label < len(places) and places[next_label] == position:
+            prog.append(("LABEL", [("label", labels[next_label])]))
+            next_label += 1
+        forward = labels[next_label:] + ["end"] if rand.random() >= undefined else ["undefined"]
+        kind: int = rand.randrange(14)
+        if kind == 0:
+            prog.append((rand.choice(("ADD", "SUB", "MUL", "IDIV")),
+                         [("var", rand.choice(INT_VARS)), operand(rand, "int"), operand(rand, "int")]))
+        elif kind == 1:
+            typ: str = rand.choice(("int", "string", "bool", "nil"))
+            prog.append(("EQ" if typ == "nil" else rand.choice(("LT", "GT", "EQ")),
+                         [("var", rand.choice(BOOL_VARS)), operand(rand, typ), operand(rand, typ)]))
+        elif kind == 2:
+            prog.append((rand.choice(("AND", "OR")),
+                         [("var", rand.choice(BOOL_VARS)), operand(rand, "bool"), operand(rand, "bool")]))
+        elif kind == 3:
+            prog.append(("NOT", [("var", rand.choice(BOOL_VARS)), operand(rand, "bool")]))
+        elif kind == 4:
+            prog.append(("CONCAT", [("var", rand.choice(STRING_VARS)), operand(rand, "string"),
+                                    operand(rand, "string")]))
+        elif kind == 5:
+            var: str = rand.choice(INT_VARS)
+            other = operand(rand, "int")
+            prog.append(("MOVE", [("var", var), other]))
+            if rand.random() < 0.5:
+                prog.append(("MOVE", [("var", var), rand.choice((other, operand(rand, "int")))]))
+            elif other[0] == "var":
+                prog.append(("MOVE", [other, ("var", var)]))
+        elif kind == 6:
+            prog.append(("JUMP", [("label", rand.choice(forward))]))
+        elif kind == 7:
+            prog.append(conditional_jump(rand, forward))
+        elif kind == 12:
+            prog.extend(stack_expression(rand, forward))
+        elif kind == 13:
+            var: str = rand.choice(STRING_VARS)
+            index = ("int", str(rand.randint(0, 1))) if rand.random() < 0.9 else operand(rand, "int")
+            char = ("string", rand.choice(("q", "\\035"))) if rand.random() < 0.9 else operand(rand, "string")
+            prog.append(("CONCAT", [("var", var), ("var", var), operand(rand, "string")]))
+            prog.append(rand.choice((("SETCHAR", [("var", var), index, char]),
+                                     ("STRLEN", [("var", rand.choice(INT_VARS)), ("var", var)]),
+                                     ("GETCHAR", [("var", rand.choice(STRING_VARS)), ("var", var), index]),
+                                     ("STRI2INT", [("var", rand.choice(INT_VARS)), ("var", var), index]))))
+        elif kind == 11 and rand.random() < 0.1:
+            prog.append(("BREAK", []))
+        elif kind == 10 and rand.random() < 0.2:
+            prog.append(("EXIT", [operand(rand, "int")]))
+        elif kind == 8:
+            prog.append(("CREATEFRAME", []))
+            prog.append(("DEFVAR", [("var", "TF@a")]))
+            prog.append(("MOVE", [("var", "TF@a"), operand(rand, "int")]))
+            prog.append(("PUSHFRAME", []))
+            prog.append(("CALL", [("label", rand.choice(("f0", "f1")) if rand.random() >= undefined else "undefined")]))
+            prog.append(("POPFRAME", []))
+            prog.append(("POPS", [("var", rand.choice(INT_VARS))]))
+        elif kind == 9 and rand.random() < 0.5:
+            prog.append(("PUSHS", [operand(rand, "int")]))
+            prog.append(("PUSHS", [operand(rand, "int")]))
+            prog.append(("POPS", [("var", rand.choice(INT_VARS))]))
+            prog.append(("POPS", [("var", rand.choice(INT_VARS))]))
+            if rand.random() < 0.1:
+                prog.append(("POPS", [("var", rand.choice(INT_VARS))]))
+        elif kind == 9:
+            prog.append(("TYPE", [("var", rand.choice(STRING_VARS)), operand(rand, rand.choice(("int", "undef")))]))
+        else:
+            prog.append(("WRITE", [operand(rand, rand.choice(("int", "string", "bool", "nil")))]))
+        if kind <= 1 and rand.random() < 0.3:
+            prog.append(conditional_jump(rand, forward))
+    while next_label < len(labels):
+        prog.append(("LABEL", [("label", labels[next_label])]))
+        next_label += 1
+    prog.append(("LABEL", [("label", "end")]))
+    for var in INT_VARS + STRING_VARS + BOOL_VARS:
+        prog.append(("WRITE", [("var", var)]))
+    return program_xml(prog)
+
+
+# Usage: difftest.py [--interpret=file] [--input=file] [--compiled] source...
+#        difftest.py [--interpret=file] --random=N [--seed=N] [--size=N] [--compiled]
+# Runs each source unoptimized (-O0) and fully optimized (-O2) and compares the exit codes and the outputs.
+# With --random, N generated programs are compared instead, the failing ones are kept in the current directory.
+# With --compiled, the interpretation without the compiled blocks is compared with the programs compiled
+# by --compile at each optimization level.
+def main():
+    interpret = os.path.join(os.path.dirname(os.path.abspath(__file__)), "interpret.py")
+    input_file = os.devnull
+    sources = list()
+    count: int = 0
+    seed: int = 0
+    size: int = 60
+    variants = [["-O0"], ["-O2"]]
+    for arg in sys.argv[1:]:
+        if arg.startswith("--interpret="):
+            interpret = arg.partition("=")[2]
+        elif arg.startswith("--input="):
+            input_file = arg.partition("=")[2]
+        elif arg.startswith("--random="):
+            count = int(arg.partition("=")[2])
+        elif arg.startswith("--seed="):
+            seed = int(arg.partition("=")[2])
+        elif arg.startswith("--size="):
+            size = int(arg.partition("=")[2])
+        elif arg == "--compiled":
+            variants = [["-O0", "--tier=0"], ["--compiled", "-O0"], ["--compiled", "-O1"], ["--compiled", "-O2"]]
+        elif not arg.startswith("--"):
+            sources.append(arg)
+        else:
+            sys.exit("Usage: difftest.py [--interpret=file] [--input=file] [--random=N [--seed=N] [--size=N]] "
+                     "[--compiled] [source]...")
+
+    failed: int = 0
+    for source in sources:
+        difference = compare(interpret, source, input_file, variants)
+        if difference:
+            print(source + ": " + difference)
+            failed += 1
+
+    rand = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "random.xml")
+        for x in range(count):
+            xml = random_program(rand, size)
+            with open(source, "w") as file:
+                file.write(xml)
+            difference = compare(interpret, source, input_file, variants)
+            if difference:
+                kept = "difftest-" + str(seed) + "-" + str(x) + ".xml"
+                with open(kept, "w") as file:
+                    file.write(xml)
+                print(kept + ": " + difference)
+                failed += 1
+
+    print("%d programs compared, %d differ" % (len(sources) + count, failed))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
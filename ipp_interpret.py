@@ -0,0 +1,4208 @@
+import io
+import os
+import sys
+import time
+import marshal                          # for the compiled program cache
+import operator                         # for the operations of the fused instructions
+from array import array                 # for the integers on the data stack
+from sys import stderr
+from operator import attrgetter         # for getting an attribute for sorting
+# Modules needed only by some runs are imported when first used, so they don't slow down the start:
+# xml.etree.ElementTree by import_xml, re by get_format, hashlib with the cache, json with the profile.
+ET = None
+
+# Version of the interpret, part of the key of the compiled program cache.
+INTERPRETER_VERSION = "1.5"
+CACHE_MAGIC = "IPPcode22-cache"
+# Type tags of the values stored in the frames and on the data stack, values themselves are python
+# ints, bools and strings, nil is None. MISSING marks a variable not defined in the frame. BUFFER marks
+# a string variable kept as a StringBuffer, it is below UNDEF, so it is handled out of the fast path
+# of reading a variable and it is never seen outside of the frame.
+MISSING = 0
+BUFFER = 1
+UNDEF = 2
+NIL = 3
+INT = 4
+BOOL = 5
+STRING = 6
+# Names of the types by their tags as returned by the TYPE instruction, argument types follow.
+TYPE_NAMES = ("", "string", "", "nil", "int", "bool", "string", "label", "type")
+# Size of the output buffer in characters, after which the buffer is flushed.
+OUTPUT_LIMIT = 1 << 16
+FLUSH_POLICIES = ("exit", "size", "line")
+# Groups of the execution statistics, which can follow the --stats option.
+STATS_GROUPS = ("--insts", "--vars", "--frames", "--stack", "--hot")
+# Instructions not counted by the statistics.
+UNCOUNTED_OPCODES = ("LABEL", "DPRINT", "BREAK")
+# Formats of the read values and of the escape sequence in strings, compiled by get_format.
+FORMATS = {
+    "int": r'[+-]?\d+|0[xX][0-9a-fA-F]+|0[oO][0-7]+',
+    "string": r'(?:\\[0-9]{3}|[^#\\])*',
+    "escape": r'\\([0-9]{3})',
+}
+# Size of the blocks in which the input for the READ instruction is read.
+INPUT_CHUNK = 1 << 20
+# Size of the blocks in which the source file is read.
+STREAM_CHUNK = 1 << 16
+# Number of the loaded programs kept by each worker of the server, the least recently used are dropped.
+SERVER_PROGRAMS = 128
+# Upper bounds of the buckets of the latency histogram of the server in milliseconds.
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+# Optimization levels selected by the -O option.
+OPT_LEVELS = ("0", "1", "2")
+DEFAULT_OPT_LEVEL = 1
+# Instructions jumping to the label in their first argument.
+JUMP_OPCODES = ("JUMP", "JUMP_COND", "STACK_JUMP_COND", "CALL")
+# Instructions after which the execution never continues with the next instruction.
+END_OPCODES = ("JUMP", "EXIT", "RETURN")
+# Executions of a basic block, after which it is compiled to a python function, 0 disables the compilation.
+TIER_THRESHOLD = 100
+# Instructions ending a basic block, the next instruction starts a new one. BREAK is in a block of its own.
+BLOCK_END_OPCODES = JUMP_OPCODES + END_OPCODES + ("ARITH_JUMP", "COMPARE_JUMP", "CALL_SEQUENCE", "BREAK")
+# Instructions changing the local and temporary frame.
+FRAME_OPCODES = ("CREATEFRAME", "PUSHFRAME", "POPFRAME")
+# Number of the discarded frames kept by the frame stack for the next CREATEFRAME
+# and the number of the slots kept in them together.
+FRAME_POOL = 1024
+FRAME_POOL_SLOTS = 1 << 16
+# Most of the local and temporary variable names of a program, for which each frame has the slots of all of them.
+# Frames of a program with more names are sparse, they keep only their own variables.
+FRAME_SLOTS = 256
+
+
+# Class with one class method to create an instruction with corresponding opcode.
+# All instructions are executed with the same signature, taking the state of the running program.
+class MakeInstruct:
+    @classmethod
+    def create(cls, opcode: str, order: int):
+        code = str.upper(opcode)
+        if code == "DEFVAR":
+            return Defvar(order)
+        elif code == "MOVE":
+            return Move(order)
+        elif code == "CREATEFRAME":
+            return CreateFrame(order)
+        elif code == "PUSHFRAME":
+            return PushFrame(order)
+        elif code == "POPFRAME":
+            return PopFrame(order)
+        elif code == "CALL":
+            return Call(order)
+        elif code == "RETURN":
+            return Return(order)
+        elif code == "PUSHS":
+            return Pushs(order)
+        elif code == "POPS":
+            return Pops(order)
+        elif code == "ADD" or code == "SUB" or code == "MUL" or code == "IDIV":
+            return ArOperations(order, code)
+        elif code == "LT" or code == "GT" or code == "EQ":
+            return Comparison(order, code)
+        elif code == "AND" or code == "OR":
+            return LogOperations(order, code)
+        elif code == "NOT":
+            return Not(order)
+        elif code == "INT2CHAR":
+            return Int2Char(order)
+        elif code == "STRI2INT":
+            return Stri2Int(order)
+        elif code == "READ":
+            return Read(order)
+        elif code == "WRITE":
+            return Write(order)
+        elif code == "CONCAT":
+            return Concat(order)
+        elif code == "STRLEN":
+            return Strlen(order)
+        elif code == "GETCHAR":
+            return Getchar(order)
+        elif code == "SETCHAR":
+            return Setchar(order)
+        elif code == "TYPE":
+            return Type(order)
+        elif code == "LABEL":
+            return Label(order)
+        elif code == "JUMP":
+            return Jump(order)
+        elif code == "JUMPIFEQ" or code == "JUMPIFNEQ":
+            return JumpCond(order, code[6:])
+        elif code == "EXIT":
+            return Exit(order)
+        elif code == "DPRINT":
+            return Dprint(order)
+        elif code == "BREAK":
+            return Break(order)
+        elif code == "CLEARS":
+            return Clears(order)
+        elif code == "ADDS" or code == "SUBS" or code == "MULS" or code == "IDIVS":
+            return StackArOperations(order, code[:-1])
+        elif code == "LTS" or code == "GTS" or code == "EQS":
+            return StackComparison(order, code[:-1])
+        elif code == "ANDS" or code == "ORS":
+            return StackLogOperations(order, code[:-1])
+        elif code == "NOTS":
+            return StackNot(order)
+        elif code == "INT2CHARS":
+            return StackInt2Char(order)
+        elif code == "STRI2INTS":
+            return StackStri2Int(order)
+        elif code == "JUMPIFEQS" or code == "JUMPIFNEQS":
+            return StackJumpCond(order, code[6:-1])
+        else:
+            throw_error("Unknown instruction\n", 32)
+
+
+# Class representing the whole program from the source file, contains a list of instructions.
+class Program:
+    tier_threshold: int = TIER_THRESHOLD
+    key: str = ""
+
+    def __init__(self):
+        self.instr_list = list()
+        self.labels = dict()
+        self.global_names = list()
+        self.local_names = list()
+        self.fusions = dict()
+        self.counts = list()
+        self.times = list()
+        self.blocks = dict()
+        self.compiled = None
+
+    # Add a new instruction with arguments in the correct order.
+    # Checks whether the instruction has the correct number of arguments, without aby duplicates with correct indexes.
+    def add_instruct(self, instr: 'Instruction'):
+        instr.args.sort(key=attrgetter("index"))
+        instr.check_args(instr.max_args)
+        tmp = set()
+        for arg in instr.args:
+            if arg.index in tmp:
+                throw_error("Arguments with the same index\n", 32)
+            else:
+                tmp.add(arg.index)
+        instr.compile_args()
+        self.instr_list.append(instr)
+
+    # Sorts the instructions by their order
+    def sort_instruct(self):
+        self.instr_list.sort(key=attrgetter("order"))
+
+    # Runs through all the instructions and all labels are added to the lable dictionary.
+    # At the same time checks, whether there are no instructions with the same order,
+    # the instructions are already sorted, so it is enough to compare the neighbouring ones.
+    # Jumps and calls to an undefined label are reported before the execution.
+    def load_labels(self):
+        label_dict = LabelDict()
+        last: int = 0
+        for index, instruct in enumerate(self.instr_list):
+            if instruct.order == last:
+                throw_error("Instructions with the same order\n", 32, instruct)
+            last = instruct.order
+
+            instruct.index = index
+            if instruct.opcode == "LABEL":
+                instruct.create_label(label_dict, index)
+        self.labels = label_dict.dict
+
+        for instruct in self.instr_list:
+            if instruct.opcode in JUMP_OPCODES and instruct.args[0].get_value() not in self.labels:
+                throw_error("Nonexistent label\n", 52, instruct)
+
+    # Links the program for the execution. Labels are removed from the executed instructions, the label points
+    # right before the instruction following it, and the jumps and calls get the indexes of their targets.
+    # The indexes of the instructions are set by their new positions.
+    def link(self):
+        result = list()
+        labels = dict()
+        for instruct in self.instr_list:
+            if instruct.opcode == "LABEL":
+                labels[instruct.args[0].get_value()] = len(result) - 1
+            else:
+                instruct.index = len(result)
+                result.append(instruct)
+        self.instr_list = result
+        self.labels = labels
+        for instruct in result:
+            instruct.link(labels)
+
+    # Assigns the slots to all variables, global variables have their own slots,
+    # local and temporary variables share them. The names are kept for printing the frames.
+    def assign_slots(self):
+        glob_slots = dict()
+        loc_slots = dict()
+        for instruct in self.instr_list:
+            for operand in instruct.ops:
+                operand.assign_slot(glob_slots, loc_slots)
+        self.global_names = list(glob_slots)
+        self.local_names = list(loc_slots)
+
+    # Creates a compact form of the sorted program with resolved labels, containing only python literals,
+    # so it can be stored by marshal in the program cache.
+    def serialize(self):
+        instructions = tuple((instr.get_code(), instr.order,
+                              tuple((arg.type, arg.value, arg.index) for arg in instr.args))
+                             for instr in self.instr_list)
+        return instructions, self.labels
+
+    # Creates the program from its serialized form, the data are expected to be already validated.
+    @classmethod
+    def deserialize(cls, data: tuple):
+        instructions, labels = data
+        prog = cls()
+        for code, order, args in instructions:
+            instruct = MakeInstruct.create(code, order)
+            for typ, value, index in args:
+                instruct.add_arg(Argument(typ, value, index, False))
+            instruct.compile_args()
+            instruct.index = len(prog.instr_list)
+            prog.instr_list.append(instruct)
+        prog.labels = labels
+        return prog
+
+    # Executes the instructions by the instruction counter. Instructions are called through a table
+    # of bound methods, the counter is kept locally and changed only by the control flow instructions,
+    # which return the index of the instruction to continue after. Hot basic blocks are compiled
+    # to python functions, which replace their first instruction in the table. A program compiled ahead of time
+    # is run by its compiled module.
+    def execute(self, state: 'MachineState'):
+        if self.compiled is not None:
+            self.compiled(state, self.instr_list)
+            return
+        table = [instruct.execute for instruct in self.instr_list]
+        if self.tier_threshold > 0:
+            self.add_block_entries(table)
+        end: int = len(table)
+        counter: int = state.label_dict.get_counter()
+
+        while counter < end:
+            jump = table[counter](state)
+            if jump is not None:
+                counter = jump
+            counter += 1
+
+    # Returns the pairs of the start and end index of the basic blocks. Blocks start at the jump targets
+    # and after the instructions changing the control flow.
+    def basic_blocks(self):
+        starts = {0}
+        starts.update(index + 1 for index in self.labels.values())
+        for index, instruct in enumerate(self.instr_list):
+            if instruct.opcode in BLOCK_END_OPCODES:
+                starts.add(index + 1)
+            if instruct.opcode == "BREAK":
+                starts.add(index)
+        starts = sorted(start for start in starts if start < len(self.instr_list))
+        return list(zip(starts, starts[1:] + [len(self.instr_list)]))
+
+    # Puts the entries of the basic blocks in the table, the blocks compiled by the previous runs
+    # of the program are used directly.
+    def add_block_entries(self, table: list):
+        for start, end in self.basic_blocks():
+            if start in self.blocks:
+                table[start] = self.blocks[start]
+            elif self.instr_list[start].opcode != "BREAK":
+                table[start] = BlockEntry(self, table, start, end).execute
+
+    # Compiles the basic block and keeps its function for the next runs.
+    def compile_block(self, start: int, end: int):
+        function = BlockCompiler(self.instr_list, start, end).compile()
+        self.blocks[start] = function
+        return function
+
+    # Executes the instructions as the execute method, but also counts the executions of each instruction.
+    # The counts are kept in the program, so they are available even when the program exits.
+    def execute_counted(self, state: 'MachineState'):
+        table = [instruct.execute for instruct in self.instr_list]
+        end: int = len(table)
+        counter: int = state.label_dict.get_counter()
+        counts = [0] * end
+        self.counts = counts
+
+        while counter < end:
+            counts[counter] += 1
+            jump = table[counter](state)
+            if jump is not None:
+                counter = jump
+            counter += 1
+
+    # Executes the instructions as the execute method, counting the executions and measuring the wall time
+    # of each instruction. The time between two readings of the clock is given to the instruction executed
+    # between them, so the dispatch is included.
+    def execute_profiled(self, state: 'MachineState'):
+        table = [instruct.execute for instruct in self.instr_list]
+        end: int = len(table)
+        counter: int = state.label_dict.get_counter()
+        counts = [0] * end
+        times = [0] * end
+        self.counts = counts
+        self.times = times
+        clock = time.perf_counter_ns
+
+        last: int = clock()
+        while counter < end:
+            index: int = counter
+            counts[index] += 1
+            jump = table[index](state)
+            if jump is not None:
+                counter = jump
+            counter += 1
+            now: int = clock()
+            times[index] += now - last
+            last = now
+
+    # Returns the region of each instruction, the name of the last label before it. Instructions before
+    # the first label are in the region "<start>". Labels at the same place share the region.
+    def label_regions(self):
+        places = dict()
+        for name, index in self.labels.items():
+            places[index] = places[index] + "," + name if index in places else name
+        regions = list()
+        region: str = "<start>"
+        for index, instruct in enumerate(self.instr_list):
+            if index - 1 in places:
+                region = places[index - 1]
+            regions.append(region)
+        return regions
+
+    # Creates the profile of the execution with the counts and times of the instructions by their order,
+    # and their sums by opcode and by label region. Times are in seconds.
+    def profile(self):
+        instructions = list()
+        opcodes = dict()
+        regions = dict()
+        for instruct, region, count, elapsed in zip(self.instr_list, self.label_regions(), self.counts, self.times):
+            if count == 0:
+                continue
+            code: str = instruct.get_code()
+            entry = {"order": instruct.order, "opcode": code, "region": region, "count": count, "time": elapsed / 1e9}
+            if isinstance(instruct, Fused):
+                entry["fused"] = [part.order for part in instruct.parts]
+            instructions.append(entry)
+            for name, table in ((code, opcodes), (region, regions)):
+                total = table.setdefault(name, [0, 0])
+                total[0] += count
+                total[1] += elapsed
+
+        def summary(table: dict, key: str):
+            result = [{key: name, "count": count, "time": elapsed / 1e9} for name, (count, elapsed) in table.items()]
+            return sorted(result, key=lambda entry: entry["time"], reverse=True)
+
+        return {"total": {"count": sum(self.counts), "time": sum(self.times) / 1e9},
+                "instructions": instructions,
+                "opcodes": summary(opcodes, "opcode"),
+                "regions": summary(regions, "label")}
+
+    # Writes the profile as json.
+    def write_profile(self, file):
+        import json
+        json.dump(self.profile(), file, indent=1)
+        file.write("\n")
+
+    # Writes the profile as a text report, each part sorted by the time.
+    def write_profile_report(self, file):
+        profile = self.profile()
+        total = profile["total"]
+        whole: float = total["time"] or 1.0
+        file.write("executed instructions %d in %.6f s\n" % (total["count"], total["time"]))
+        for title, key, entries in (("opcode", "opcode", profile["opcodes"]), ("label region", "label", profile["regions"]),
+                                    ("order opcode", "order", sorted(profile["instructions"],
+                                                                     key=lambda entry: entry["time"], reverse=True))):
+            file.write("\n%-24s %12s %12s %7s %10s\n" % (title, "count", "time [s]", "time %", "us/exec"))
+            for entry in entries:
+                name: str = str(entry[key]) if key != "order" else "%-6d %s" % (entry["order"], entry["opcode"])
+                file.write("%-24s %12d %12.6f %6.2f%% %10.3f\n" %
+                           (name, entry["count"], entry["time"], entry["time"] / whole * 100,
+                            entry["time"] / entry["count"] * 1e6))
+
+    # Writes the report of the fused instructions, how many were created and how many times they were executed.
+    def write_fusion_stats(self, file):
+        executed = dict()
+        saved: int = 0
+        for instruct, count in zip(self.instr_list, self.counts):
+            if isinstance(instruct, Fused):
+                executed[instruct.opcode] = executed.get(instruct.opcode, 0) + count
+                saved += count * (len(instruct.parts) - 1)
+        file.write("%-16s %10s %12s\n" % ("fusion", "sites", "executed"))
+        for name in sorted(self.fusions):
+            file.write("%-16s %10d %12d\n" % (name, self.fusions[name], executed.get(name, 0)))
+        file.write("executed instructions %d, saved dispatches %d\n" % (sum(self.counts), saved))
+
+    # Debug function to print all of the instructions with its arguments.
+    def print(self):
+        for instr in self.instr_list:
+            print("opcode: " + instr.opcode, end=" order: ")
+            print(instr.order, end=" arg_nmb: ")
+            print(instr.arg_nmb, end="\n\t")
+            for arg in instr.args:
+                print("type: " + arg.type, end=" value: ")
+                print(arg.value)
+
+
+# Optimizer of the loaded program, transforms its sorted instruction list by the passes of the optimization level.
+# Level 1 threads the jumps, removes the unreachable code and fuses the known sequences of instructions.
+# Level 2 also folds the operations with constant operands, removes redundant moves and replaces the instructions
+# with the proven operand types by their variants without the type checks.
+# Passes keep the output, the exit code and the error code of the program, an instruction which could end
+# with an error is never removed.
+class Optimizer:
+    def __init__(self, prog: 'Program'):
+        self.prog = prog
+        self.instrs = prog.instr_list
+
+    # The optimized program is linked at every level, so no label is executed.
+    def run(self, level: int):
+        if level >= 1:
+            if level >= 2:
+                self.fold_constants()
+            self.thread_jumps()
+            self.remove_unreachable()
+            if level >= 2:
+                self.remove_moves()
+                self.specialize_types()
+            self.fuse()
+        self.prog.instr_list = self.instrs
+        self.prog.link()
+        self.prog.assign_slots()
+
+    # Returns the positions of the labels in the instruction list.
+    def find_labels(self):
+        return {instr.args[0].get_value(): index for index, instr in enumerate(self.instrs) if instr.opcode == "LABEL"}
+
+    # Returns the position of the first instruction, which is not a label, from the given position.
+    def skip_labels(self, index: int):
+        while index < len(self.instrs) and self.instrs[index].opcode == "LABEL":
+            index += 1
+        return index
+
+    # Replaces the instructions with constant operands by a move of the result or by a jump.
+    def fold_constants(self):
+        labels = self.find_labels()
+        result = list()
+        for instr in self.instrs:
+            folded = instr.fold(labels)
+            if folded is not None:
+                result.append(folded)
+        self.instrs = result
+
+    # Jumps to a label followed by an unconditional jump are redirected to the final label. Only defined labels
+    # are used, as the conditional jump checks its label even if it does not jump. Jumps to the instruction
+    # right after them are removed.
+    def thread_jumps(self):
+        labels = self.find_labels()
+        final = dict()
+        result = list()
+        for index, instr in enumerate(self.instrs):
+            if instr.opcode not in JUMP_OPCODES:
+                result.append(instr)
+                continue
+
+            name: str = self.final_label(instr.args[0].get_value(), labels, final)
+            if name != instr.args[0].get_value():
+                instr = instr.derive(instr.get_code(), [Argument("label", name, 1, False)] + instr.args[1:])
+            if instr.opcode == "JUMP" and name in labels and \
+                    self.skip_labels(labels[name] + 1) == self.skip_labels(index + 1):
+                continue
+            result.append(instr)
+        self.instrs = result
+
+    # Returns the label, where the chain of the unconditional jumps from the given label ends. The end is
+    # remembered for all the labels of the chain, so each chain is followed only once.
+    def final_label(self, name: str, labels: dict, final: dict):
+        chain = dict()                          # labels of the chain, in their order
+        while name in labels and name not in final and name not in chain:
+            chain[name] = None
+            target: int = self.skip_labels(labels[name] + 1)
+            if target == len(self.instrs) or self.instrs[target].opcode != "JUMP" or \
+                    self.instrs[target].args[0].get_value() not in labels:
+                break
+            name = self.instrs[target].args[0].get_value()
+
+        name = final.get(name, name)
+        for label in chain:
+            final[label] = name
+        return name
+
+    # Removes the instructions, which can not be reached from the start of the program by any path.
+    # Labels never used by a jump are removed as well.
+    def remove_unreachable(self):
+        labels = self.find_labels()
+        reached = bytearray(len(self.instrs))
+        work = [0]
+        while len(work) != 0:
+            index: int = work.pop()
+            if index >= len(self.instrs) or reached[index]:
+                continue
+            reached[index] = 1
+            instr: 'Instruction' = self.instrs[index]
+            if instr.opcode in JUMP_OPCODES and instr.args[0].get_value() in labels:
+                work.append(labels[instr.args[0].get_value()])
+            if instr.opcode not in END_OPCODES:
+                work.append(index + 1)
+        self.instrs = [instr for instr, used in zip(self.instrs, reached) if used]
+
+    # Removes a move repeating the previous one or moving the value back, and a move of a constant overwritten
+    # by the next move of a constant. Only neighbouring moves are compared, there is no label between them.
+    def remove_moves(self):
+        result = list()
+        for instr in self.instrs:
+            if instr.opcode == "MOVE" and len(result) != 0 and result[-1].opcode == "MOVE":
+                dest, src = instr.ops
+                last_dest, last_src = result[-1].ops
+                if dest.is_same(last_dest) and src.is_same(last_src):
+                    continue
+                if dest.is_same(last_src) and src.is_same(last_dest) and isinstance(dest, GlobalVar):
+                    continue
+                if dest.is_same(last_dest) and type(src) is Constant and type(last_src) is Constant:
+                    result[-1] = instr
+                    continue
+            result.append(instr)
+        self.instrs = result
+
+    # Replaces the instructions with the operand types proven by the type inference by their variants,
+    # which don't check the types.
+    def specialize_types(self):
+        inference = TypeInference(self.instrs)
+        inference.run()
+        self.instrs = [instr.specialize(tuple(inference.proven_type(index, op) for op in instr.ops))
+                       for index, instr in enumerate(self.instrs)]
+
+    # Replaces the known sequences of instructions by one fused instruction. The sequences never contain a label,
+    # so no jump goes inside them, and a call can be only the last instruction of the sequence.
+    def fuse(self):
+        result = list()
+        index: int = 0
+        while index < len(self.instrs):
+            for fusion in FUSIONS:
+                fused = fusion.match(self.instrs, index)
+                if fused is not None:
+                    self.prog.fusions[fused.opcode] = self.prog.fusions.get(fused.opcode, 0) + 1
+                    result.append(fused)
+                    index += len(fused.parts)
+                    break
+            else:
+                result.append(self.instrs[index])
+                index += 1
+        self.instrs = result
+
+
+# Type inference over the control flow graph of the sorted instructions with their labels. For each reached
+# instruction, it finds the possible types of the variables in the global frame before it, variables of the local
+# and temporary frames are not tracked. The possible types are masks by the type tags, a string buffer
+# is a string. The masks of all the variables are kept in one integer, with 8 bits for each variable.
+class TypeInference:
+    valid = (1 << NIL) | (1 << INT) | (1 << BOOL) | (1 << STRING)
+    # Type of the result and the types of the other operands, which the instruction requires to succeed.
+    writers = {"AR_OPERATION": (1 << INT, (1 << INT, 1 << INT)),
+               "COMPARE": (1 << BOOL, (valid, valid)),
+               "LOG_OPETARION": (1 << BOOL, (1 << BOOL, 1 << BOOL)),
+               "NOT": (1 << BOOL, (1 << BOOL,)),
+               "INT2CHAR": (1 << STRING, (1 << INT,)),
+               "STRI2INT": (1 << INT, (1 << STRING, 1 << INT)),
+               "CONCAT": (1 << STRING, (1 << STRING, 1 << STRING)),
+               "STRLEN": (1 << INT, (1 << STRING,)),
+               "GETCHAR": (1 << STRING, (1 << STRING, 1 << INT)),
+               "SETCHAR": (1 << STRING, (1 << INT, 1 << STRING)),
+               "TYPE": (1 << STRING, (valid | (1 << UNDEF),)),
+               "MOVE": (None, (valid,)),
+               "POPS": (valid, ()),
+               "DEFVAR": (1 << UNDEF, ())}
+    # Types of the operands, which the instruction requires to succeed.
+    readers = {"WRITE": (valid,), "PUSHS": (valid,), "DPRINT": (valid,), "EXIT": (1 << INT,),
+               "JUMP_COND": (valid, valid, valid)}
+    read_types = {"int": INT, "string": STRING, "bool": BOOL}
+
+    def __init__(self, instrs: list):
+        self.instrs = instrs
+        self.labels = {instr.args[0].get_value(): index for index, instr in enumerate(instrs)
+                       if instr.opcode == "LABEL"}
+        self.returns = [index + 1 for index, instr in enumerate(instrs) if instr.opcode == "CALL" and
+                        index + 1 < len(instrs)]
+        self.shifts = dict()
+        for instr in instrs:
+            for op in instr.ops:
+                if type(op) is GlobalVar and op.name not in self.shifts:
+                    self.shifts[op.name] = 8 * len(self.shifts)
+        self.states = [None] * len(instrs)
+
+    # Finds the types before each instruction, the state is None for an instruction, which is never reached.
+    # At the start, all the variables are missing. States only grow, so the iteration ends. Nothing follows
+    # the instruction, which always fails.
+    def run(self):
+        if len(self.instrs) == 0:
+            return
+        self.states[0] = sum(1 << shift for shift in self.shifts.values())
+        work = [0]
+        while len(work) != 0:
+            index: int = work.pop()
+            state = self.transfer(self.instrs[index], self.states[index])
+            if state is None or self.always_fails(index):
+                continue
+            for following in self.successors(index):
+                old = self.states[following]
+                new: int = state if old is None else old | state
+                if new != old:
+                    self.states[following] = new
+                    work.append(following)
+
+    # Returns the instructions, which can follow the instruction. Return can go after any call.
+    def successors(self, index: int):
+        instr: 'Instruction' = self.instrs[index]
+        following = [index + 1] if index + 1 < len(self.instrs) else []
+        if instr.opcode in JUMP_OPCODES:
+            target = self.labels.get(instr.args[0].get_value())
+            targets = [] if target is None else [target]
+            return targets if instr.opcode in ("JUMP", "CALL") else following + targets
+        if instr.opcode == "RETURN":
+            return self.returns
+        if instr.opcode == "EXIT":
+            return []
+        return following
+
+    # Returns the mask of the possible types of the operand, None if they are unknown.
+    def mask(self, state: int, op: 'Operand'):
+        if type(op) is Constant:
+            return 1 << op.type
+        if type(op) is GlobalVar:
+            return (state >> self.shifts[op.name]) & 0xFF
+        return None
+
+    def set_mask(self, state: int, op: 'Operand', mask: int):
+        if type(op) is not GlobalVar:
+            return state
+        shift: int = self.shifts[op.name]
+        return (state & ~(0xFF << shift)) | (mask << shift)
+
+    # Returns the state after the instruction succeeded, its operands have the required types. None is returned
+    # if the instruction can't succeed.
+    def transfer(self, instr: 'Instruction', state: int):
+        ops: tuple = instr.ops
+        if instr.opcode in self.writers:
+            result, required = self.writers[instr.opcode]
+            if instr.opcode == "MOVE":
+                result = self.mask(state, ops[1])
+                result = self.valid if result is None else result & self.valid
+            elif instr.opcode == "SETCHAR" and type(ops[0]) is GlobalVar:
+                result &= self.mask(state, ops[0])
+            for op, mask in zip(ops[1:], required):
+                if type(op) is GlobalVar:
+                    state = self.set_mask(state, op, self.mask(state, op) & mask)
+                    if self.mask(state, op) == 0:
+                        return None
+            if result == 0:
+                return None
+            return self.set_mask(state, ops[0], result)
+        if instr.opcode == "READ":
+            return self.set_mask(state, ops[0], (1 << self.read_types[instr.args[1].get_value()]) | (1 << NIL))
+        required = self.readers.get(instr.opcode, ())
+        for index, op in enumerate(ops):
+            if type(op) is GlobalVar:
+                mask: int = self.mask(state, op)
+                mask = mask & required[index] if index < len(required) else mask | self.valid
+                if mask == 0:
+                    return None
+                state = self.set_mask(state, op, mask)
+        return state
+
+    # Returns the type of the operand proven before the instruction, None if it isn't proven.
+    def proven_type(self, index: int, op: 'Operand'):
+        if self.states[index] is None:
+            return None
+        mask = self.mask(self.states[index], op)
+        if mask is None or mask == 0 or mask & ~self.valid or mask & (mask - 1):
+            return None
+        return mask.bit_length() - 1
+
+    # Checks whether the instruction always ends with the error of the wrong operand types when it is reached.
+    # The operands must be defined and initialized, else another error may come first.
+    def always_fails(self, index: int):
+        instr: 'Instruction' = self.instrs[index]
+        if self.states[index] is None:
+            return False
+        if instr.opcode in self.writers and instr.opcode not in ("MOVE", "TYPE", "POPS", "DEFVAR"):
+            ops = instr.ops if instr.opcode == "SETCHAR" else instr.ops[1:]
+            required = self.writers[instr.opcode][1]
+            required = ((1 << STRING),) + required if instr.opcode == "SETCHAR" else required
+        elif instr.opcode in ("EXIT", "JUMP_COND"):
+            ops = instr.ops if instr.opcode == "EXIT" else instr.ops[1:]
+            required = (1 << INT,) if instr.opcode == "EXIT" else (self.valid, self.valid)
+        else:
+            return False
+        masks = [self.mask(self.states[index], op) for op in ops]
+        if any(mask is None or mask == 0 or mask & ~self.valid for mask in masks):
+            return False
+        if instr.opcode == "JUMP_COND" or (instr.opcode == "COMPARE" and instr.type == "EQ"):
+            return masks[0] & masks[1] == 0 and (masks[0] | masks[1]) & (1 << NIL) == 0
+        if instr.opcode == "COMPARE":
+            return masks[0] & masks[1] & ~(1 << NIL) == 0
+        return any(mask & need == 0 for mask, need in zip(masks, required))
+
+    # Writes the reached instructions, which always fail with the wrong operand types, by their order.
+    def write_errors(self, file):
+        for index, instr in enumerate(self.instrs):
+            if self.always_fails(index):
+                file.write("Instruction %d %s: wrong types of arguments\n" % (instr.order, instr.get_code()))
+
+
+# Entry of a basic block in the table of the executed instructions. It counts the executions of the block,
+# at the threshold the block is compiled and its function replaces the entry.
+class BlockEntry:
+    def __init__(self, prog: 'Program', table: list, start: int, end: int):
+        self.prog = prog
+        self.table = table
+        self.start = start
+        self.end = end
+        self.first = table[start]
+        self.count: int = 0
+
+    def execute(self, state: 'MachineState'):
+        self.count += 1
+        if self.count < self.prog.tier_threshold:
+            return self.first(state)
+        function = self.prog.compile_block(self.start, self.end)
+        self.table[self.start] = function
+        return function(state)
+
+
+# Continues the instruction of a compiled block in the interpreter, when the compiled code can't execute it,
+# so any error is reported by the instruction itself. A fused instruction continues from the given part.
+# Returns the jump of the block, the index of the instruction if it doesn't jump.
+def resume_instruction(state: 'MachineState', instruct: 'Instruction', index: int, part: int):
+    if part == 0:
+        jump = instruct.execute(state)
+    else:
+        jump = None
+        for piece in instruct.parts[part:]:
+            jump = piece.execute(state)
+            if jump is not None:
+                break
+    return index if jump is None else jump
+
+
+# Variable of a compiled block kept in the locals of the function. It is loaded when its value is in the locals,
+# dirty when it must be written back to the frame, its type is set when it is known at compile time.
+class BlockVar:
+    def __init__(self, kind: str, slot: int):
+        self.kind = kind
+        self.slot = slot
+        self.name = kind + str(slot)
+        self.loaded = False
+        self.exists = False
+        self.dirty = False
+        self.type = None
+
+
+# Compiler of a basic block to a python function returning the jump as the instructions. Variables are kept
+# in the locals of the function and written back to the frames at the exits of the block and before
+# the instructions, which are executed by their execute method. The simple instructions are compiled
+# for the operands of the valid types, checked by the guards. When a guard fails, the locals are written back
+# and the instruction continues in the interpreter, which reports any error as without the compilation.
+# Strings changed in place and all other instructions are left to the interpreter.
+class BlockCompiler:
+    natives = ("MOVE", "AR_OPERATION", "COMPARE", "LOG_OPETARION", "NOT", "PUSHS", "POPS", "WRITE", "JUMP",
+               "JUMP_COND", "STACK_AR_OPERATION", "STACK_JUMP_COND")
+    operators = {"ADD": "+", "SUB": "-", "MUL": "*", "IDIV": "//", "LT": "<", "GT": ">", "EQ": "==",
+                 "AND": "and", "OR": "or"}
+
+    def __init__(self, instrs: list, start: int, end: int):
+        self.instrs = instrs
+        self.start = start
+        self.end = end
+        self.lines = list()
+        self.constants = list()
+        self.names = dict()
+        self.vars = dict()
+        self.stack = list()
+        self.temps: int = 0
+        self.fetched = set()
+        self.ended = False
+
+    def compile(self):
+        namespace = dict()
+        exec(compile(self.source("make_block"), "<block " + str(self.start) + ">", "exec"), globals(), namespace)
+        return namespace["make_block"](self.instrs)
+
+    # Returns the source of the function with the given name, which creates the function of the block
+    # for the instructions of the program.
+    def source(self, name: str):
+        for index in range(self.start, self.end):
+            instruct = self.instrs[index]
+            if isinstance(instruct, Fused) and instruct.opcode != "CALL_SEQUENCE":
+                for part, piece in enumerate(instruct.parts):
+                    self.compile_instruction(piece, index, part, "instrs[%d].parts[%d]" % (index, part))
+            else:
+                self.compile_instruction(instruct, index, 0, "instrs[%d]" % index)
+        if not self.ended:
+            self.write_back()
+            self.emit("return " + str(self.end - 1))
+
+        code = ["def " + name + "(instrs):"]
+        code.extend("    %s = %s" % (self.names[expression], expression) for expression in self.constants)
+        code.append("    def block(state):")
+        code.extend(self.lines)
+        code.append("    return block")
+        return "\n".join(code) + "\n"
+
+    def emit(self, line: str, depth: int = 0):
+        self.lines.append("        " + "    " * depth + line)
+
+    # Returns the name of the object used by the compiled code, given by its expression on the instructions.
+    def constant(self, expression: str):
+        name = self.names.get(expression)
+        if name is None:
+            name = self.names[expression] = "k" + str(len(self.constants))
+            self.constants.append(expression)
+        return name
+
+    # Compiles the instruction or the part of a fused instruction, given by its expression on the instructions.
+    def compile_instruction(self, instr: 'Instruction', index: int, part: int, expression: str):
+        if self.is_native(instr):
+            getattr(self, "compile_" + instr.opcode.lower())(instr, index, part)
+        else:
+            self.compile_generic(instr, index, expression)
+
+    # Checks whether the instruction is compiled directly, the operands are checked at runtime.
+    def is_native(self, instr: 'Instruction'):
+        if instr.opcode not in self.natives or any(type(op) is InvalidInt for op in instr.ops):
+            return False
+        if instr.opcode in ("MOVE", "AR_OPERATION", "COMPARE", "LOG_OPETARION", "NOT", "POPS"):
+            return isinstance(instr.ops[0], GlobalVar)
+        return True
+
+    # Executes the instruction by its execute method, the variables of its operands are written back before
+    # and loaded again after it. Instructions changing the frames invalidate all the local and temporary variables.
+    def compile_generic(self, instr: 'Instruction', index: int, expression: str):
+        keys = set(self.key(op) for op in instr.ops if isinstance(op, GlobalVar))
+        if instr.opcode in FRAME_OPCODES:
+            keys = set(key for key in self.vars if key[0] != "g")
+        function: str = self.constant(expression + ".execute")
+        if instr.opcode in BLOCK_END_OPCODES:
+            self.write_back()
+            self.emit("jump = " + function + "(state)")
+            self.emit("return " + str(index) + " if jump is None else jump")
+            self.ended = True
+            return
+        self.flush_stack()
+        self.write_back(keys)
+        self.emit(function + "(state)")
+        for key in keys:
+            self.vars.pop(key, None)
+        if instr.opcode in FRAME_OPCODES:
+            self.fetched.difference_update(("l", "t"))
+
+    @staticmethod
+    def key(op: 'Operand'):
+        if type(op) is GlobalVar:
+            return "g", op.slot
+        return ("l" if type(op) is LocalVar else "t"), op.slot
+
+    # Emits the code continuing the instruction in the interpreter, the dirty variables are written back.
+    def emit_resume(self, index: int, part: int, depth: int):
+        for line in self.write_back_lines():
+            self.emit(line, depth)
+        self.emit("return resume_instruction(state, %s, %d, %d)" % (self.constant("instrs[%d]" % index), index, part),
+                  depth)
+
+    # Emits the guard, which continues the instruction in the interpreter when any of the conditions holds.
+    # The conditions known at compile time are bool values.
+    def guard(self, conditions: list, index: int, part: int):
+        if True in conditions:
+            self.emit_resume(index, part, 0)
+            return
+        conditions = list(dict.fromkeys(condition for condition in conditions if condition is not False))
+        if len(conditions) != 0:
+            self.emit("if " + " or ".join(conditions) + ":")
+            self.emit_resume(index, part, 1)
+
+    # Returns the lines writing back the dirty variables of the keys, all of them and also the values
+    # kept for the data stack when no keys are given.
+    def write_back_lines(self, keys=None):
+        lines = list()
+        for key, var in self.vars.items():
+            if var.dirty and (keys is None or key in keys):
+                lines.append("%sv[%d] = %sv" % (var.kind, var.slot, var.name))
+                lines.append("%st[%d] = %s" % (var.kind, var.slot, self.type_expr(var)))
+        if keys is None:
+            lines.extend(self.stack_lines())
+        return lines
+
+    def write_back(self, keys=None):
+        for line in self.write_back_lines(keys):
+            self.emit(line)
+        for key, var in self.vars.items():
+            if keys is None or key in keys:
+                var.dirty = False
+        if keys is None:
+            self.stack.clear()
+
+    # Returns the lines pushing the values kept in the locals to the data stack.
+    def stack_lines(self):
+        lines = list()
+        for value, typ in self.stack:
+            if type(typ) is int:
+                lines.extend(self.push_lines(value, typ))
+            else:
+                lines.append("if %s == %d:" % (typ, INT))
+                lines.extend("    " + line for line in self.push_lines(value, INT))
+                lines.append("else:")
+                lines.extend("    " + line for line in self.push_lines(value, typ))
+        return lines
+
+    # Returns the lines pushing the value with the type to the arrays of the data stack, an integer out
+    # of the range of the array is pushed by the data stack.
+    @staticmethod
+    def push_lines(value: str, typ):
+        if typ == INT:
+            return ["try:", "    dsi.append(%s)" % value, "    dst.append(%d)" % INT, "except OverflowError:",
+                    "    ds.push(%s, %d)" % (value, INT)]
+        return ["dsv.append(%s)" % value, "dst.append(%s)" % typ]
+
+    def flush_stack(self):
+        for line in self.stack_lines():
+            self.emit(line)
+        self.stack.clear()
+
+    # Returns the name of a new local for an intermediate value.
+    def temp(self):
+        self.temps += 1
+        return "s%d" % (self.temps - 1)
+
+    @staticmethod
+    def type_expr(var: 'BlockVar'):
+        return var.name + "t" if var.type is None else str(var.type)
+
+    # Fetches the values and types of the frame to the locals, the local and temporary frame must be initialized.
+    def fetch_frame(self, kind: str, index: int, part: int):
+        if kind in self.fetched:
+            return
+        if kind == "g":
+            self.emit("gv = state.glob_frame.values")
+            self.emit("gt = state.glob_frame.types")
+        else:
+            self.emit("frame = state.frame_stack." + ("loc_frame" if kind == "l" else "temp_frame"))
+            self.guard(["frame.init is not True"], index, part)
+            self.emit(kind + "v = frame.values")
+            self.emit(kind + "t = frame.types")
+        self.fetched.add(kind)
+
+    # The arrays of the data stack are fetched with it, they are changed only in place.
+    def fetch_stack(self):
+        if "ds" not in self.fetched:
+            self.emit("ds = state.data_stack")
+            self.emit("dst = ds.types")
+            self.emit("dsi = ds.ints")
+            self.emit("dsv = ds.values")
+            self.fetched.add("ds")
+
+    def variable(self, op: 'Operand', index: int, part: int):
+        key = self.key(op)
+        self.fetch_frame(key[0], index, part)
+        var = self.vars.get(key)
+        if var is None:
+            var = self.vars[key] = BlockVar(*key)
+        return var
+
+    # Returns the expression of the value of the operand and its type, which is the type tag if it is known
+    # at compile time, else the expression. A variable is loaded to the locals on its first use,
+    # the string buffer is read as its flat text.
+    def load(self, op: 'Operand', index: int, part: int):
+        if isinstance(op, Constant):
+            return repr(op.value), op.type
+        var = self.variable(op, index, part)
+        if not var.loaded:
+            value: str = var.name + "v"
+            typ: str = var.name + "t"
+            self.emit("%s = %st[%d]" % (typ, var.kind, var.slot))
+            self.emit("if %s <= %d:" % (typ, UNDEF))
+            self.emit("if %s != %d:" % (typ, BUFFER), 1)
+            self.emit_resume(index, part, 2)
+            self.emit("%s = %sv[%d].flat()" % (value, var.kind, var.slot), 1)
+            self.emit("%s = %d" % (typ, STRING), 1)
+            self.emit("else:")
+            self.emit("%s = %sv[%d]" % (value, var.kind, var.slot), 1)
+            var.loaded = True
+            var.exists = True
+        return var.name + "v", var.name + "t" if var.type is None else var.type
+
+    # Sets the type of the variable known after the guard.
+    def know(self, op: 'Operand', typ: int):
+        if isinstance(op, GlobalVar):
+            self.vars[self.key(op)].type = typ
+
+    # Checks that the variable is defined, before anything is changed by the instruction.
+    def check_defined(self, op: 'Operand', index: int, part: int):
+        var = self.variable(op, index, part)
+        if not var.exists:
+            self.guard(["%st[%d] == %d" % (var.kind, var.slot, MISSING)], index, part)
+            var.exists = True
+
+    # Sets the variable in the locals, the type known at compile time is used without its local.
+    def store(self, op: 'Operand', value: str, typ):
+        var = self.vars[self.key(op)]
+        self.emit("%sv = %s" % (var.name, value))
+        if type(typ) is not int:
+            self.emit("%st = %s" % (var.name, typ))
+        var.loaded = True
+        var.dirty = True
+        var.type = typ if type(typ) is int else None
+
+    @staticmethod
+    def differs(typ, expected: int):
+        return typ != expected if type(typ) is int else "%s != %d" % (typ, expected)
+
+    # Returns the conditions of different types of the operands, or of nil when it isn't allowed, and the type
+    # known after the guard.
+    @staticmethod
+    def same_type(typ1, typ2, nil: bool):
+        known = typ1 if type(typ1) is int else typ2 if type(typ2) is int else None
+        conditions = [typ1 != typ2 if known is not None and type(typ2) is type(typ1) else "%s != %s" % (typ1, typ2)]
+        if not nil:
+            conditions.append(known == NIL if known is not None else "%s == %d" % (typ1, NIL))
+        return conditions, known
+
+    def compile_move(self, instr: 'Instruction', index: int, part: int):
+        value, typ = self.load(instr.ops[1], index, part)
+        self.check_defined(instr.ops[0], index, part)
+        self.store(instr.ops[0], value, typ)
+
+    def compile_ar_operation(self, instr: 'Instruction', index: int, part: int):
+        value1, typ1 = self.load(instr.ops[1], index, part)
+        value2, typ2 = self.load(instr.ops[2], index, part)
+        conditions = [self.differs(typ1, INT), self.differs(typ2, INT)]
+        if instr.type == "IDIV":
+            conditions.append(instr.ops[2].value == 0 if isinstance(instr.ops[2], Constant) else value2 + " == 0")
+        self.guard(conditions, index, part)
+        self.know(instr.ops[1], INT)
+        self.know(instr.ops[2], INT)
+        self.check_defined(instr.ops[0], index, part)
+        self.store(instr.ops[0], "%s %s %s" % (value1, self.operators[instr.type], value2), INT)
+
+    def compile_compare(self, instr: 'Instruction', index: int, part: int):
+        value1, typ1 = self.load(instr.ops[1], index, part)
+        value2, typ2 = self.load(instr.ops[2], index, part)
+        conditions, known = self.same_type(typ1, typ2, False)
+        self.guard(conditions, index, part)
+        if known is not None:
+            self.know(instr.ops[1], known)
+            self.know(instr.ops[2], known)
+        self.check_defined(instr.ops[0], index, part)
+        self.store(instr.ops[0], "%s %s %s" % (value1, self.operators[instr.type], value2), BOOL)
+
+    def compile_log_opetarion(self, instr: 'Instruction', index: int, part: int):
+        value1, typ1 = self.load(instr.ops[1], index, part)
+        value2, typ2 = self.load(instr.ops[2], index, part)
+        self.guard([self.differs(typ1, BOOL), self.differs(typ2, BOOL)], index, part)
+        self.know(instr.ops[1], BOOL)
+        self.know(instr.ops[2], BOOL)
+        self.check_defined(instr.ops[0], index, part)
+        self.store(instr.ops[0], "%s %s %s" % (value1, self.operators[instr.type], value2), BOOL)
+
+    def compile_not(self, instr: 'Instruction', index: int, part: int):
+        value, typ = self.load(instr.ops[1], index, part)
+        self.guard([self.differs(typ, BOOL)], index, part)
+        self.know(instr.ops[1], BOOL)
+        self.check_defined(instr.ops[0], index, part)
+        self.store(instr.ops[0], "not " + value, BOOL)
+
+    # Pushed values are kept in the locals, so the next stack instructions of the block take them from there.
+    # They are pushed to the data stack at the exits of the block and before the instructions executed
+    # by the interpreter. Values of the variables are copied, as the variables can change before.
+    def compile_pushs(self, instr: 'Instruction', index: int, part: int):
+        value, typ = self.load(instr.ops[0], index, part)
+        self.fetch_stack()
+        if not isinstance(instr.ops[0], Constant):
+            name: str = self.temp()
+            self.emit("%sv = %s" % (name, value))
+            value = name + "v"
+            if type(typ) is not int:
+                self.emit("%st = %s" % (name, typ))
+                typ = name + "t"
+        self.stack.append((value, typ))
+
+    def compile_pops(self, instr: 'Instruction', index: int, part: int):
+        self.check_defined(instr.ops[0], index, part)
+        if len(self.stack) != 0:
+            value, typ = self.stack.pop()
+            self.store(instr.ops[0], value, typ)
+            return
+        self.fetch_stack()
+        self.guard(["not dst"], index, part)
+        var = self.vars[self.key(instr.ops[0])]
+        self.emit("%st = dst.pop()" % var.name)
+        self.emit("if %st == %d:" % (var.name, INT))
+        self.emit("%sv = dsi.pop()" % var.name, 1)
+        self.emit("else:")
+        self.emit("%sv = dsv.pop()" % var.name, 1)
+        self.emit("if %st == %d:" % (var.name, DataStack.boxed_int), 1)
+        self.emit("%st = %d" % (var.name, INT), 2)
+        var.loaded = True
+        var.dirty = True
+        var.type = None
+
+    # Operations on two integers from the top of the data stack, other values are left to the interpreter.
+    # Operands, which are not in the locals, are popped from the data stack, the result is kept in the locals.
+    def compile_stack_ar_operation(self, instr: 'Instruction', index: int, part: int):
+        operands = self.stack[-2:]
+        missing: int = 2 - len(operands)
+        conditions = list()
+        if missing != 0:
+            self.fetch_stack()
+            conditions.append("len(dst) < %d" % missing)
+            conditions.extend("dst[-%d] != %d" % (depth + 1, INT) for depth in range(missing))
+        conditions.extend(self.differs(typ, INT) for value, typ in operands)
+        if instr.type == "IDIV":
+            divisor: str = operands[-1][0] if len(operands) != 0 else "dsi[-1]"
+            conditions.append(divisor == "0" if divisor.isdigit() else "%s == 0" % divisor)
+        self.guard(conditions, index, part)
+
+        del self.stack[len(self.stack) - len(operands):]
+        if missing != 0:
+            self.emit("del dst[-%d:]" % missing)
+            for depth in range(missing):
+                name: str = self.temp()
+                self.emit("%sv = dsi.pop()" % name)
+                operands.insert(0, (name + "v", INT))
+        name: str = self.temp()
+        self.emit("%sv = %s %s %s" % (name, operands[0][0], self.operators[instr.type], operands[1][0]))
+        self.stack.append((name + "v", INT))
+
+    def compile_write(self, instr: 'Instruction', index: int, part: int):
+        op: 'Operand' = instr.ops[0]
+        if isinstance(op, Constant):
+            self.emit("output.write(%r)" % to_text(op.value, op.type))
+            return
+        value, typ = self.load(op, index, part)
+        if typ == STRING:
+            self.emit("output.write(%s)" % value)
+        elif typ == INT:
+            self.emit("output.write(str(%s))" % value)
+        else:
+            self.emit("output.write(to_text(%s, %s))" % (value, typ))
+
+    def compile_jump(self, instr: 'Instruction', index: int, part: int):
+        self.write_back()
+        self.emit("return " + str(instr.target))
+        self.ended = True
+
+    def compile_jump_cond(self, instr: 'Instruction', index: int, part: int):
+        value1, typ1 = self.load(instr.ops[1], index, part)
+        value2, typ2 = self.load(instr.ops[2], index, part)
+        self.guard(self.same_type(typ1, typ2, True)[0], index, part)
+        self.write_back()
+        self.emit("if %s %s %s:" % (value1, "==" if instr.type == "EQ" else "!=", value2))
+        self.emit("return " + str(instr.target), 1)
+        self.emit("return " + str(index))
+        self.ended = True
+
+    # Values of the same type are compared, the values from the data stack must be integers.
+    def compile_stack_jump_cond(self, instr: 'Instruction', index: int, part: int):
+        relation: str = "==" if instr.type == "EQ" else "!="
+        if len(self.stack) >= 2:
+            (value1, typ1), (value2, typ2) = self.stack[-2:]
+            self.guard(self.same_type(typ1, typ2, True)[0], index, part)
+            del self.stack[-2:]
+            self.write_back()
+            self.emit("if %s %s %s:" % (value1, relation, value2))
+        else:
+            self.flush_stack()
+            self.fetch_stack()
+            self.guard(["len(dst) < 2", "dst[-1] != %d" % INT, "dst[-2] != %d" % INT], index, part)
+            self.write_back()
+            self.emit("del dst[-2:]")
+            self.emit("if dsi.pop() %s dsi.pop():" % relation)
+        self.emit("return " + str(instr.target), 1)
+        self.emit("return " + str(index))
+        self.ended = True
+
+
+# Basic class for the instruction, contains its opcode, order, execution type, list of arguments
+# and number of arguments. From this class are inherited  classes for each type of the instruction.
+class Instruction:
+    def __init__(self, opcode: str, order: int):
+        if order <= 0:
+            throw_error("Order out of range\n", 32)
+        self.opcode = opcode
+        self.order = order
+        self.args = list()
+        self.ops = tuple()
+        self.arg_nmb = 0
+        self.index = 0
+
+    def add_arg(self, arg: 'Argument'):
+        self.args.append(arg)
+        self.arg_nmb += 1
+
+    def check_args(self, max_arg: int):
+        if max_arg != self.arg_nmb:
+            throw_error("Wrong number of arguments for instruction\n", 32, self)
+        x: int = 1
+        for arg in self.args:
+            if arg.index != x:
+                throw_error("Wrong index of argument for instruction\n", 32, self)
+            x += 1
+
+    # Returns the opcode as written in the source code.
+    def get_code(self):
+        return self.opcode
+
+    # Decodes the arguments into operands, so the execution does no string work to access them.
+    def compile_args(self):
+        self.ops = tuple(arg.compile() for arg in self.args)
+
+    # Creates the instruction with the same order and the given arguments, which replaces this one.
+    def derive(self, code: str, args: list):
+        instruct = MakeInstruct.create(code, self.order)
+        for arg in args:
+            instruct.add_arg(arg)
+        instruct.compile_args()
+        instruct.index = self.index
+        return instruct
+
+    # Returns the instruction doing the same work with constant operands, None if there is nothing to do.
+    # By default the instruction is kept.
+    def fold(self, labels: dict):
+        return self
+
+    # Returns the instruction doing the same work for the operands of the proven types, None for an unknown type.
+    # By default the instruction is kept.
+    def specialize(self, types: tuple):
+        return self
+
+    # Resolves the label of the jump or the call to the index of the instruction to continue after.
+    def link(self, labels: dict):
+        if self.opcode in JUMP_OPCODES:
+            self.target: int = labels[self.args[0].get_value()]
+
+    # Creates the variant of the instruction of the given class with the same operands, which replaces this one.
+    def typed(self, cls: type):
+        instruct = object.__new__(cls)
+        instruct.__dict__.update(self.__dict__)
+        return instruct
+
+    # Checks whether the result goes to a variable and all the other operands are valid constants.
+    def can_fold(self):
+        return isinstance(self.ops[0], GlobalVar) and all(type(op) is Constant for op in self.ops[1:])
+
+    # Creates the move of the constant to the variable in the first argument.
+    def move_constant(self, value, typ: int):
+        return self.derive("MOVE", [self.args[0], Argument(TYPE_NAMES[typ], to_text(value, typ), 2, False)])
+
+
+# Next are the classes for each type of instruction with its max(expected) number
+# of arguments and a function for its execution.
+
+# Creates an uninitialized variable within the given frame.
+class Defvar(Instruction):
+    max_args = 1
+
+    def __init__(self, order: int):
+        super().__init__("DEFVAR", order)
+
+    def execute(self, state: 'MachineState'):
+        self.ops[0].input_var(state)
+
+
+# Sets the given variable to given value.
+class Move(Instruction):
+    max_args = 2
+
+    def __init__(self, order: int):
+        super().__init__("MOVE", order)
+
+    def execute(self, state: 'MachineState'):
+        value = self.ops[1].get_value(state)
+        typ: int = self.ops[1].get_type(state)
+
+        self.ops[0].set_value(state, value, typ)
+
+
+# Creates a new temporary frame.
+class CreateFrame(Instruction):
+    max_args = 0
+
+    def __init__(self, order: int):
+        super().__init__("CREATEFRAME", order)
+
+    def execute(self, state: 'MachineState'):
+        state.frame_stack.create_temp_frame()
+
+
+# Pushes the temporary frame onto the frame stack. Local frame points at the top frame in the frame stack.
+# Temporary frame is left uninitialized.
+class PushFrame(Instruction):
+    max_args = 0
+
+    def __init__(self, order: int):
+        super().__init__("PUSHFRAME", order)
+
+    def execute(self, state: 'MachineState'):
+        state.frame_stack.add_frame()
+
+
+# Pops the frame from the frame stack in the temporary frame. Local frame points at the top frame in the frame stack.
+class PopFrame(Instruction):
+    max_args = 0
+
+    def __init__(self, order: int):
+        super().__init__("POPFRAME", order)
+
+    def execute(self, state: 'MachineState'):
+        state.frame_stack.remove_frame()
+
+
+# Jumps to the given label with the possibility of returning. Index before jumping is stores in the call stack.
+class Call(Instruction):
+    max_args = 1
+
+    def __init__(self, order: int):
+        super().__init__("CALL", order)
+
+    def execute(self, state: 'MachineState'):
+        state.label_dict.store_index(self.index)
+        return self.target
+
+
+# Returns to the last call instruction.
+class Return(Instruction):
+    max_args = 0
+
+    def __init__(self, order: int):
+        super().__init__("RETURN", order)
+
+    def execute(self, state: 'MachineState'):
+        return state.label_dict.pop_index()
+
+
+# Pushes the value to the data stack.
+class Pushs(Instruction):
+    max_args = 1
+
+    def __init__(self, order: int):
+        super().__init__("PUSHS", order)
+
+    def execute(self, state: 'MachineState'):
+        value = self.ops[0].get_value(state)
+        typ: int = self.ops[0].get_type(state)
+
+        state.data_stack.push(value, typ)
+
+
+# Pops the value from data stack to given variable.
+class Pops(Instruction):
+    max_args = 1
+
+    def __init__(self, order: int):
+        super().__init__("POPS", order)
+
+    def execute(self, state: 'MachineState'):
+        typ: int
+        value, typ = state.data_stack.pop()
+        self.ops[0].set_value(state, value, typ)
+
+
+# Executes the given arithmetic operation on the last two arguments storing the result in the first argument.
+class ArOperations(Instruction):
+    # ADD, SUB, MUL, IDIV
+    max_args = 3
+
+    def __init__(self, order: int, typ: str):
+        super().__init__("AR_OPERATION", order)
+        self.type = typ
+
+    def get_code(self):
+        return self.type
+
+    def execute(self, state: 'MachineState'):
+        if not check_type(self.ops[1], self.ops[2], state, INT):
+            throw_error("Wrong types of arguments\n", 53, self)
+
+        val1: int = self.ops[1].get_value(state)
+        val2: int = self.ops[2].get_value(state)
+        result: int = 0
+
+        if self.type == "ADD":
+            result = val1 + val2
+        elif self.type == "SUB":
+            result = val1 - val2
+        elif self.type == "MUL":
+            result = val1 * val2
+        elif self.type == "IDIV":
+            try:
+                result = val1 // val2
+            except ZeroDivisionError:
+                throw_error("Cannot divide by zero\n", 57, self)
+        else:
+            throw_error("Inner problem\n", 99, self)
+
+        self.ops[0].set_value(state, result, INT)
+
+    def fold(self, labels: dict):
+        if not self.can_fold() or self.ops[1].type != INT or self.ops[2].type != INT:
+            return self
+        val1: int = self.ops[1].value
+        val2: int = self.ops[2].value
+        if self.type == "ADD":
+            return self.move_constant(val1 + val2, INT)
+        elif self.type == "SUB":
+            return self.move_constant(val1 - val2, INT)
+        elif self.type == "MUL":
+            return self.move_constant(val1 * val2, INT)
+        elif self.type == "IDIV" and val2 != 0:
+            return self.move_constant(val1 // val2, INT)
+        return self
+
+    def specialize(self, types: tuple):
+        if types[1] == INT and types[2] == INT:
+            return self.typed(TypedArOperation)
+        return self
+
+
+# Arithmetic operation on the operands proven to be integers, their types are not checked.
+class TypedArOperation(ArOperations):
+    operations = {"ADD": operator.add, "SUB": operator.sub, "MUL": operator.mul, "IDIV": operator.floordiv}
+
+    def execute(self, state: 'MachineState'):
+        val2: int = self.ops[2].get_value(state)
+        if val2 == 0 and self.type == "IDIV":
+            throw_error("Cannot divide by zero\n", 57, self)
+        self.ops[0].set_value(state, self.operations[self.type](self.ops[1].get_value(state), val2), INT)
+
+
+# Executes the given comparing operation on the last two arguments storing the result(bool value) in the first argument.
+class Comparison(Instruction):
+    # LT, GT, EQ
+    max_args = 3
+
+    def __init__(self, order: int, typ: str):
+        super().__init__("COMPARE", order)
+        self.type = typ
+
+    def get_code(self):
+        return self.type
+
+    def execute(self, state: 'MachineState'):
+        if not check_type(self.ops[1], self.ops[2], state) and \
+             self.ops[1].get_type(state) != NIL and \
+             self.ops[2].get_type(state) != NIL:
+            throw_error("Wrong types of arguments\n", 53, self)
+
+        val1 = self.ops[1].get_value(state)
+        val2 = self.ops[2].get_value(state)
+
+        if self.type == "EQ":
+            self.ops[0].set_value(state, val1 == val2, BOOL)
+        else:
+            if self.ops[1].get_type(state) == NIL or \
+                    self.ops[2].get_type(state) == NIL:
+                throw_error("Wrong types of arguments\n", 53, self)
+
+            elif self.type == "LT":
+                self.ops[0].set_value(state, val1 < val2, BOOL)
+
+            elif self.type == "GT":
+                self.ops[0].set_value(state, val1 > val2, BOOL)
+
+    def fold(self, labels: dict):
+        if not self.can_fold():
+            return self
+        typ1: int = self.ops[1].type
+        typ2: int = self.ops[2].type
+        if typ1 != typ2 and typ1 != NIL and typ2 != NIL:
+            return self
+        if self.type == "EQ":
+            return self.move_constant(self.ops[1].value == self.ops[2].value, BOOL)
+        if typ1 == NIL or typ2 == NIL:
+            return self
+        if self.type == "LT":
+            return self.move_constant(self.ops[1].value < self.ops[2].value, BOOL)
+        return self.move_constant(self.ops[1].value > self.ops[2].value, BOOL)
+
+    def specialize(self, types: tuple):
+        if types[1] is not None and types[1] == types[2] and types[1] != NIL:
+            return self.typed(TypedComparison)
+        return self
+
+
+# Comparison of the operands proven to have the same type other than nil, their types are not checked.
+class TypedComparison(Comparison):
+    operations = {"LT": operator.lt, "GT": operator.gt, "EQ": operator.eq}
+
+    def execute(self, state: 'MachineState'):
+        self.ops[0].set_value(state, self.operations[self.type](self.ops[1].get_value(state),
+                                                                self.ops[2].get_value(state)), BOOL)
+
+
+# Executes the given logical operation on the last two arguments storing the result in the first argument.
+class LogOperations(Instruction):
+    # AND, OR
+    max_args = 3
+
+    def __init__(self, order: int, typ: str):
+        super().__init__("LOG_OPETARION", order)
+        self.type = typ
+
+    def get_code(self):
+        return self.type
+
+    def execute(self, state: 'MachineState'):
+        if not check_type(self.ops[1], self.ops[2], state, BOOL):
+            throw_error("Wrong types of arguments\n", 53, self)
+
+        first: bool = self.ops[1].get_value(state)
+        second: bool = self.ops[2].get_value(state)
+        result: bool = False
+
+        if self.type == "AND":
+            result = first and second
+        elif self.type == "OR":
+            result = first or second
+
+        self.ops[0].set_value(state, result, BOOL)
+
+    def fold(self, labels: dict):
+        if not self.can_fold() or self.ops[1].type != BOOL or self.ops[2].type != BOOL:
+            return self
+        if self.type == "AND":
+            return self.move_constant(self.ops[1].value and self.ops[2].value, BOOL)
+        return self.move_constant(self.ops[1].value or self.ops[2].value, BOOL)
+
+    def specialize(self, types: tuple):
+        if types[1] == BOOL and types[2] == BOOL:
+            return self.typed(TypedLogOperation)
+        return self
+
+
+# Logical operation on the operands proven to be bool, their types are not checked.
+class TypedLogOperation(LogOperations):
+    def execute(self, state: 'MachineState'):
+        if self.type == "AND":
+            self.ops[0].set_value(state, self.ops[1].get_value(state) and self.ops[2].get_value(state), BOOL)
+        else:
+            self.ops[0].set_value(state, self.ops[1].get_value(state) or self.ops[2].get_value(state), BOOL)
+
+
+# Executes the logical operation not on the given value storing the result in the first argument.
+class Not(Instruction):
+    max_args = 2
+
+    def __init__(self, order: int):
+        super().__init__("NOT", order)
+
+    def execute(self, state: 'MachineState'):
+        if self.ops[1].get_type(state) != BOOL:
+            throw_error("Wrong type of arguments\n", 53, self)
+
+        result: bool = not self.ops[1].get_value(state)
+        self.ops[0].set_value(state, result, BOOL)
+
+    def fold(self, labels: dict):
+        if not self.can_fold() or self.ops[1].type != BOOL:
+            return self
+        return self.move_constant(not self.ops[1].value, BOOL)
+
+    def specialize(self, types: tuple):
+        return self.typed(TypedNot) if types[1] == BOOL else self
+
+
+# Negation of the operand proven to be bool, its type is not checked.
+class TypedNot(Not):
+    def execute(self, state: 'MachineState'):
+        self.ops[0].set_value(state, not self.ops[1].get_value(state), BOOL)
+
+
+# Changes the integer value to a character by its ASCII value storing the result.
+class Int2Char(Instruction):
+    max_args = 2
+
+    def __init__(self, order: int):
+        super().__init__("INT2CHAR", order)
+
+    def execute(self, state: 'MachineState'):
+        if self.ops[1].get_type(state) != INT:
+            throw_error("Wrong types of arguments\n", 53, self)
+
+        value: int = self.ops[1].get_value(state)
+        result: str = ""
+
+        try:
+            result = chr(value)
+        except (ValueError, OverflowError):
+            throw_error("Value out of range while converting int to char\n", 58)
+        self.ops[0].set_value(state, result, STRING)
+
+    def specialize(self, types: tuple):
+        return self.typed(TypedInt2Char) if types[1] == INT else self
+
+
+# Conversion of the operand proven to be int, its type is not checked.
+class TypedInt2Char(Int2Char):
+    def execute(self, state: 'MachineState'):
+        try:
+            result: str = chr(self.ops[1].get_value(state))
+        except (ValueError, OverflowError):
+            throw_error("Value out of range while converting int to char\n", 58)
+        self.ops[0].set_value(state, result, STRING)
+
+
+# Changes the character on the given index in a string to an integer by its ASCII value storing the result.
+class Stri2Int(Instruction):
+    max_args = 3
+
+    def __init__(self, order: int):
+        super().__init__("STRI2INT", order)
+
+    def execute(self, state: 'MachineState'):
+        if self.ops[1].get_type(state) != STRING or \
+                self.ops[2].get_type(state) != INT:
+            throw_error("Wrong types of arguments\n", 53, self)
+
+        index: int = self.ops[2].get_value(state)
+        string = self.ops[1].get_chars(state)
+        if len(string) <= index or index < 0:
+            throw_error("Indexing out of range\n", 58, self)
+
+        result: int = ord(string[index])
+        self.ops[0].set_value(state, result, INT)
+
+    def specialize(self, types: tuple):
+        return self.typed(TypedStri2Int) if types[1] == STRING and types[2] == INT else self
+
+
+# Conversion of the string and the index proven by their types, the types are not checked.
+class TypedStri2Int(Stri2Int):
+    def execute(self, state: 'MachineState'):
+        index: int = self.ops[2].get_value(state)
+        string = self.ops[1].get_chars(state)
+        if len(string) <= index or index < 0:
+            throw_error("Indexing out of range\n", 58, self)
+        self.ops[0].set_value(state, ord(string[index]), INT)
+
+
+# Reads data of given type form the input on one line. If there are no such data, value is set to nil.
+class Read(Instruction):
+    max_args = 2
+
+    def __init__(self, order: int):
+        super().__init__("READ", order)
+
+    # The parser of the read type is chosen at load time.
+    def compile_args(self):
+        super().compile_args()
+        if self.args[1].get_value() not in READ_PARSERS:
+            throw_error("Wrong type for the instruction READ\n", 32, self)
+        self.parser = READ_PARSERS[self.args[1].get_value()]
+
+    def execute(self, state: 'MachineState'):
+        line: str = state.input_file.read_line()
+        if line == "":
+            self.ops[0].set_value(state, None, NIL)
+            return
+
+        value, typ = self.parser(line)
+        self.ops[0].set_value(state, value, typ)
+
+
+# Parsers of the read line for each type, return the value and its type, nil for a line in a wrong format.
+def read_int(line: str):
+    if get_format("int").fullmatch(line) is None:
+        return None, NIL
+    return parse_int(line), INT
+
+
+def read_string(line: str):
+    if "\\" not in line and "#" not in line:
+        return line, STRING
+    if get_format("string").fullmatch(line) is None:
+        return None, NIL
+    return decode_escapes(line), STRING
+
+
+def read_bool(line: str):
+    return line.upper() == "TRUE", BOOL
+
+
+READ_PARSERS = {"int": read_int, "string": read_string, "bool": read_bool}
+
+
+# Prints the value fo variable to stdout, is the value is nil empty string is printed.
+class Write(Instruction):
+    max_args = 1
+
+    def __init__(self, order: int):
+        super().__init__("WRITE", order)
+
+    def execute(self, state: 'MachineState'):
+        output.write(to_text(self.ops[0].get_value(state), self.ops[0].get_type(state)))
+
+
+# Concatenates two strings storing the result in the first argument.
+class Concat(Instruction):
+    max_args = 3
+
+    def __init__(self, order: int):
+        super().__init__("CONCAT", order)
+        self.append = False
+
+    # Concatenation to the same variable appends to its string buffer.
+    def compile_args(self):
+        super().compile_args()
+        self.append = isinstance(self.ops[0], GlobalVar) and self.ops[0].is_same(self.ops[1])
+
+    def execute(self, state: 'MachineState'):
+        if self.append:
+            buffer: 'StringBuffer' = self.ops[0].get_buffer(state)
+            if buffer is not None and self.ops[2].get_type(state) == STRING and \
+                    buffer.append_text(self.ops[2].get_value(state)):
+                return
+
+        if not check_type(self.ops[1], self.ops[2], state, STRING):
+            throw_error("Wrong types of operands\n", 53, self)
+
+        result: str = self.ops[1].get_value(state) + self.ops[2].get_value(state)
+        self.ops[0].set_value(state, result, STRING)
+
+    def fold(self, labels: dict):
+        if not self.can_fold() or self.ops[1].type != STRING or self.ops[2].type != STRING:
+            return self
+        return self.move_constant(self.ops[1].value + self.ops[2].value, STRING)
+
+
+# Gets the length on the string and store it in the first argument.
+class Strlen(Instruction):
+    max_args = 2
+
+    def __init__(self, order: int):
+        super().__init__("STRLEN", order)
+
+    def execute(self, state: 'MachineState'):
+        if self.ops[1].get_type(state) != STRING:
+            throw_error("Wrong types of operands\n", 53, self)
+
+        length: int = len(self.ops[1].get_chars(state))
+        self.ops[0].set_value(state, length, INT)
+
+    def specialize(self, types: tuple):
+        return self.typed(TypedStrlen) if types[1] == STRING else self
+
+
+# Length of the operand proven to be a string, its type is not checked.
+class TypedStrlen(Strlen):
+    def execute(self, state: 'MachineState'):
+        self.ops[0].set_value(state, len(self.ops[1].get_chars(state)), INT)
+
+
+# Gets the character on the given index in the string, storing hte result in the first argument.
+class Getchar(Instruction):
+    max_args = 3
+
+    def __init__(self, order: int):
+        super().__init__("GETCHAR", order)
+
+    def execute(self, state: 'MachineState'):
+        if self.ops[1].get_type(state) != STRING or \
+                self.ops[2].get_type(state) != INT:
+            throw_error("Wrong types of arguments\n", 53, self)
+
+        index: int = self.ops[2].get_value(state)
+        string = self.ops[1].get_chars(state)
+        if len(string) <= index or index < 0:
+            throw_error("Indexing out of range\n", 58, self)
+
+        self.ops[0].set_value(state, string[index], STRING)
+
+    def specialize(self, types: tuple):
+        return self.typed(TypedGetchar) if types[1] == STRING and types[2] == INT else self
+
+
+# Character of the string and the index proven by their types, the types are not checked.
+class TypedGetchar(Getchar):
+    def execute(self, state: 'MachineState'):
+        index: int = self.ops[2].get_value(state)
+        string = self.ops[1].get_chars(state)
+        if len(string) <= index or index < 0:
+            throw_error("Indexing out of range\n", 58, self)
+        self.ops[0].set_value(state, string[index], STRING)
+
+
+# Changes the character in the string on the given index to another one.
+class Setchar(Instruction):
+    max_args = 3
+
+    def __init__(self, order: int):
+        super().__init__("SETCHAR", order)
+
+    # The string in a variable is changed in its string buffer, any error is reported by the whole execution.
+    def execute(self, state: 'MachineState'):
+        buffer: 'StringBuffer' = self.ops[0].get_buffer(state)
+        if buffer is not None and self.ops[1].get_type(state) == INT and self.ops[2].get_type(state) == STRING:
+            index: int = self.ops[1].get_value(state)
+            replace: str = self.ops[2].get_value(state)
+            if len(buffer) > index >= 0 and len(replace) != 0 and buffer.set_char(index, replace[0]):
+                return
+        self.execute_flat(state)
+
+    def execute_flat(self, state: 'MachineState'):
+        if self.ops[0].get_type(state) != STRING or \
+            self.ops[1].get_type(state) != INT or \
+            self.ops[2].get_type(state) != STRING:
+            throw_error("Wrong types of arguments\n", 53, self)
+
+        string: str = self.ops[0].get_value(state)
+        index: int = self.ops[1].get_value(state)
+        replace: str = self.ops[2].get_value(state)
+        if len(string) <= index or index < 0 or len(replace) == 0:
+            throw_error("Indexing out of range\n", 58, self)
+
+        string = string[:index] + replace[0] + string[index+1:]
+        self.ops[0].set_value(state, string, STRING)
+
+
+# Gets and stores the type of the given variable.
+class Type(Instruction):
+    max_args = 2
+
+    def __init__(self, order: int):
+        super().__init__("TYPE", order)
+
+    def execute(self, state: 'MachineState'):
+        typ: int = self.ops[1].get_type_undef(state)
+        self.ops[0].set_value(state, TYPE_NAMES[typ], STRING)
+
+
+# Represents the label.
+class Label(Instruction):
+    max_args = 1
+
+    def __init__(self, order: int):
+        super().__init__("LABEL", order)
+
+    def create_label(self, label_dict: 'LabelDict', index: int):
+        label_dict.add_label(self.args[0].get_value(), index + 1)
+
+    def execute(self, state: 'MachineState'):
+        return
+
+
+# Jumps to the given label and continues the instructions from there.
+class Jump(Instruction):
+    max_args = 1
+
+    def __init__(self, order: int):
+        super().__init__("JUMP", order)
+
+    def execute(self, state: 'MachineState'):
+        return self.target
+
+
+# Evaluates the condition and if it is satisfied, the jump is preformed.
+class JumpCond(Instruction):
+    max_args = 3
+
+    def __init__(self, order: int, typ: str):
+        super().__init__("JUMP_COND", order)
+        self.type = typ
+
+    def get_code(self):
+        return "JUMPIF" + self.type
+
+    def execute(self, state: 'MachineState'):
+        if not check_type(self.ops[1], self.ops[2], state) and \
+                self.ops[1].get_type(state) != NIL and \
+                self.ops[2].get_type(state) != NIL:
+            throw_error("Wrong types of arguments\n", 53, self)
+
+        val1 = self.ops[1].get_value(state)
+        val2 = self.ops[2].get_value(state)
+        if self.type == "EQ":
+            if val1 == val2:
+                return self.target
+        elif self.type == "NEQ":
+            if val1 != val2:
+                return self.target
+
+    # The jump with constant operands to a defined label is replaced by an unconditional jump or removed.
+    def fold(self, labels: dict):
+        if self.args[0].get_value() not in labels or any(type(op) is not Constant for op in self.ops[1:]):
+            return self
+        typ1: int = self.ops[1].type
+        typ2: int = self.ops[2].type
+        if typ1 != typ2 and typ1 != NIL and typ2 != NIL:
+            return self
+        if (self.ops[1].value == self.ops[2].value) == (self.type == "EQ"):
+            return self.derive("JUMP", self.args[:1])
+        return None
+
+    def specialize(self, types: tuple):
+        if types[1] is not None and types[1] == types[2]:
+            return self.typed(TypedJumpCond)
+        return self
+
+
+# Conditional jump on the operands proven to have the same type, their types are not checked.
+class TypedJumpCond(JumpCond):
+    def execute(self, state: 'MachineState'):
+        val1 = self.ops[1].get_value(state)
+        val2 = self.ops[2].get_value(state)
+        if (val1 == val2) == (self.type == "EQ"):
+            return self.target
+
+
+# Exit the execution of the program with the given return value.
+class Exit(Instruction):
+    max_args = 1
+
+    def __init__(self, order: int):
+        super().__init__("EXIT", order)
+
+    def execute(self, state: 'MachineState'):
+        value: int = self.ops[0].get_value(state)
+        typ: int = self.ops[0].get_type(state)
+        if typ != INT:
+            throw_error("Wrong types of arguments\n", 53, self)
+        if value < 0 or value > 49:
+            throw_error("Exit code out of range\n", 57, self)
+
+        output.flush()
+        exit(value)
+
+
+# Prints the value of the given variable to the stderr.
+class Dprint(Instruction):
+    max_args = 1
+
+    def __init__(self, order: int):
+        super().__init__("DPRINT", order)
+
+    def execute(self, state: 'MachineState'):
+        text: str = to_text(self.ops[0].get_value(state), self.ops[0].get_type(state))
+        output.flush()
+        stderr.write(text)
+
+
+# Prints the actual instruction and the content all frames.
+class Break(Instruction):
+    max_args = 0
+
+    def __init__(self, order: int):
+        super().__init__("BREAK", order)
+
+    def execute(self, state: 'MachineState'):
+        output.flush()
+        stderr.write("Instruction number " + str(self.order) + " with opcode " + self.opcode + "\n")
+        stderr.write("Global frame:\n")
+        state.glob_frame.print_frame()
+        stderr.write("Local frame:\n")
+        state.frame_stack.loc_frame.print_frame()
+        stderr.write("Temporary frame:\n")
+        state.frame_stack.temp_frame.print_frame()
+
+
+# Next are the instructions of the STACK extension, which take their operands from the data stack and push
+# the result back. The second operand is on the top of the stack, the empty stack is reported by the data stack.
+# Operations are looked up once, when the instruction is created.
+
+# Removes all values from the data stack.
+class Clears(Instruction):
+    max_args = 0
+
+    def __init__(self, order: int):
+        super().__init__("CLEARS", order)
+
+    def execute(self, state: 'MachineState'):
+        state.data_stack.clear()
+
+
+# Executes the given arithmetic operation on the two values from the top of the data stack.
+class StackArOperations(Instruction):
+    # ADDS, SUBS, MULS, IDIVS
+    max_args = 0
+    operations = {"ADD": operator.add, "SUB": operator.sub, "MUL": operator.mul, "IDIV": operator.floordiv}
+
+    def __init__(self, order: int, typ: str):
+        super().__init__("STACK_AR_OPERATION", order)
+        self.type = typ
+        self.operation = self.operations[typ]
+
+    def get_code(self):
+        return self.type + "S"
+
+    def execute(self, state: 'MachineState'):
+        data_stack: 'DataStack' = state.data_stack
+        val1, typ1, val2, typ2 = data_stack.pop_pair()
+        if typ1 != INT or typ2 != INT:
+            throw_error("Wrong types of arguments\n", 53, self)
+        if val2 == 0 and self.type == "IDIV":
+            throw_error("Cannot divide by zero\n", 57, self)
+        data_stack.push(self.operation(val1, val2), INT)
+
+
+# Compares the two values from the top of the data stack, only EQS accepts nil.
+class StackComparison(Instruction):
+    # LTS, GTS, EQS
+    max_args = 0
+    operations = {"LT": operator.lt, "GT": operator.gt, "EQ": operator.eq}
+
+    def __init__(self, order: int, typ: str):
+        super().__init__("STACK_COMPARE", order)
+        self.type = typ
+        self.operation = self.operations[typ]
+
+    def get_code(self):
+        return self.type + "S"
+
+    def execute(self, state: 'MachineState'):
+        data_stack: 'DataStack' = state.data_stack
+        val1, typ1, val2, typ2 = data_stack.pop_pair()
+        if typ1 != typ2 and typ1 != NIL and typ2 != NIL:
+            throw_error("Wrong types of arguments\n", 53, self)
+        if (typ1 == NIL or typ2 == NIL) and self.type != "EQ":
+            throw_error("Wrong types of arguments\n", 53, self)
+        data_stack.push(self.operation(val1, val2), BOOL)
+
+
+# Executes the given logical operation on the two values from the top of the data stack.
+class StackLogOperations(Instruction):
+    # ANDS, ORS
+    max_args = 0
+
+    def __init__(self, order: int, typ: str):
+        super().__init__("STACK_LOG_OPERATION", order)
+        self.type = typ
+
+    def get_code(self):
+        return self.type + "S"
+
+    def execute(self, state: 'MachineState'):
+        data_stack: 'DataStack' = state.data_stack
+        val1, typ1, val2, typ2 = data_stack.pop_pair()
+        if typ1 != BOOL or typ2 != BOOL:
+            throw_error("Wrong types of arguments\n", 53, self)
+        if self.type == "AND":
+            data_stack.push(val1 and val2, BOOL)
+        else:
+            data_stack.push(val1 or val2, BOOL)
+
+
+# Negates the bool value on the top of the data stack.
+class StackNot(Instruction):
+    max_args = 0
+
+    def __init__(self, order: int):
+        super().__init__("NOTS", order)
+
+    def execute(self, state: 'MachineState'):
+        data_stack: 'DataStack' = state.data_stack
+        value, typ = data_stack.pop()
+        if typ != BOOL:
+            throw_error("Wrong type of arguments\n", 53, self)
+        data_stack.push(not value, BOOL)
+
+
+# Changes the integer on the top of the data stack to a character by its ASCII value.
+class StackInt2Char(Instruction):
+    max_args = 0
+
+    def __init__(self, order: int):
+        super().__init__("INT2CHARS", order)
+
+    def execute(self, state: 'MachineState'):
+        data_stack: 'DataStack' = state.data_stack
+        value, typ = data_stack.pop()
+        if typ != INT:
+            throw_error("Wrong types of arguments\n", 53, self)
+        try:
+            data_stack.push(chr(value), STRING)
+        except (ValueError, OverflowError):
+            throw_error("Value out of range while converting int to char\n", 58)
+
+
+# Changes the character of the string on the given index to an integer, the index is on the top of the data stack.
+class StackStri2Int(Instruction):
+    max_args = 0
+
+    def __init__(self, order: int):
+        super().__init__("STRI2INTS", order)
+
+    def execute(self, state: 'MachineState'):
+        data_stack: 'DataStack' = state.data_stack
+        string, typ1, index, typ2 = data_stack.pop_pair()
+        if typ1 != STRING or typ2 != INT:
+            throw_error("Wrong types of arguments\n", 53, self)
+        if len(string) <= index or index < 0:
+            throw_error("Indexing out of range\n", 58, self)
+        data_stack.push(ord(string[index]), INT)
+
+
+# Compares the two values from the top of the data stack and if the condition is satisfied, the jump is preformed.
+class StackJumpCond(Instruction):
+    max_args = 1
+
+    def __init__(self, order: int, typ: str):
+        super().__init__("STACK_JUMP_COND", order)
+        self.type = typ
+
+    def get_code(self):
+        return "JUMPIF" + self.type + "S"
+
+    def execute(self, state: 'MachineState'):
+        data_stack: 'DataStack' = state.data_stack
+        val1, typ1, val2, typ2 = data_stack.pop_pair()
+        if typ1 != typ2 and typ1 != NIL and typ2 != NIL:
+            throw_error("Wrong types of arguments\n", 53, self)
+        if (val1 == val2) == (self.type == "EQ"):
+            return self.target
+
+
+# Basic class for the fused instructions, which do the work of a sequence of instructions in one dispatch.
+# The instructions of the sequence are kept as parts, errors are reported by them. Operands of all the parts
+# are collected, so their variables get the slots. The name of the fusion is used as the opcode.
+class Fused(Instruction):
+    max_args = 0
+    name = "FUSED"
+
+    def __init__(self, parts: list):
+        super().__init__(self.name, parts[0].order)
+        self.parts = parts
+        self.index = parts[0].index
+        self.ops = tuple(op for part in parts for op in part.ops)
+
+    # Returns the fused instruction for the sequence starting at the given index, None if it does not match.
+    @classmethod
+    def match(cls, instrs: list, index: int):
+        return None
+
+    # Parts are linked as well, they are executed when the fused instruction reports an error.
+    def link(self, labels: dict):
+        for part in self.parts:
+            part.link(labels)
+
+
+# Arithmetic operation followed by a conditional jump, as at the end of a counting loop. The common case of valid
+# operands is done directly, otherwise the parts are executed to report the error. Division is not fused.
+class ArithJump(Fused):
+    name = "ARITH_JUMP"
+    first_opcode = "AR_OPERATION"
+    operations = {"ADD": operator.add, "SUB": operator.sub, "MUL": operator.mul}
+
+    def __init__(self, parts: list):
+        super().__init__(parts)
+        self.first = parts[0].execute
+        self.second = parts[1].execute
+        self.operation = self.operations[parts[0].type]
+        self.dest, self.src1, self.src2 = parts[0].ops
+        self.left, self.right = parts[1].ops[1:]
+        self.equal: bool = parts[1].type == "EQ"
+
+    @classmethod
+    def match(cls, instrs: list, index: int):
+        if instrs[index].opcode == cls.first_opcode and instrs[index].type in cls.operations and \
+                index + 1 < len(instrs) and instrs[index + 1].opcode == "JUMP_COND":
+            return cls(instrs[index:index + 2])
+        return None
+
+    def link(self, labels: dict):
+        super().link(labels)
+        self.target: int = self.parts[1].target
+
+    def execute(self, state: 'MachineState'):
+        src1: 'Operand' = self.src1
+        src2: 'Operand' = self.src2
+        if src1.get_type(state) != INT or src2.get_type(state) != INT:
+            self.first(state)
+            return self.second(state)
+        self.dest.set_value(state, self.operation(src1.get_value(state), src2.get_value(state)), INT)
+
+        left: 'Operand' = self.left
+        right: 'Operand' = self.right
+        if left.get_type(state) != right.get_type(state):
+            return self.second(state)
+        if (left.get_value(state) == right.get_value(state)) == self.equal:
+            return self.target
+
+
+# Comparison followed by a conditional jump, usually on its result. Comparison with nil is left to the parts.
+class CompareJump(ArithJump):
+    name = "COMPARE_JUMP"
+    first_opcode = "COMPARE"
+    operations = {"LT": operator.lt, "GT": operator.gt, "EQ": operator.eq}
+
+    def execute(self, state: 'MachineState'):
+        src1: 'Operand' = self.src1
+        src2: 'Operand' = self.src2
+        typ: int = src1.get_type(state)
+        if typ != src2.get_type(state) or typ == NIL:
+            self.first(state)
+        else:
+            self.dest.set_value(state, self.operation(src1.get_value(state), src2.get_value(state)), BOOL)
+
+        left: 'Operand' = self.left
+        right: 'Operand' = self.right
+        if left.get_type(state) != right.get_type(state):
+            return self.second(state)
+        if (left.get_value(state) == right.get_value(state)) == self.equal:
+            return self.target
+
+
+# Definition of a variable followed by setting its value.
+class DefvarMove(Fused):
+    name = "DEFVAR_MOVE"
+
+    def __init__(self, parts: list):
+        super().__init__(parts)
+        self.var: 'Operand' = parts[1].ops[0]
+        self.source: 'Operand' = parts[1].ops[1]
+
+    @classmethod
+    def match(cls, instrs: list, index: int):
+        if instrs[index].opcode == "DEFVAR" and index + 1 < len(instrs) and instrs[index + 1].opcode == "MOVE" and \
+                instrs[index].ops[0].is_same(instrs[index + 1].ops[0]):
+            return cls(instrs[index:index + 2])
+        return None
+
+    def execute(self, state: 'MachineState'):
+        self.var.input_var(state)
+        value = self.source.get_value(state)
+        typ: int = self.source.get_type(state)
+        self.var.set_value(state, value, typ)
+
+
+# Call of a function with the arguments in the temporary frame:
+# CREATEFRAME, DEFVAR and MOVE of the arguments, PUSHFRAME and CALL.
+class CallSequence(Fused):
+    name = "CALL_SEQUENCE"
+
+    def __init__(self, parts: list):
+        super().__init__(parts)
+        self.body = tuple(part.execute for part in parts[1:-2])
+
+    @classmethod
+    def match(cls, instrs: list, index: int):
+        if instrs[index].opcode != "CREATEFRAME":
+            return None
+        end: int = index + 1
+        while end < len(instrs) and instrs[end].opcode in ("DEFVAR", "MOVE"):
+            end += 1
+        if end + 1 < len(instrs) and instrs[end].opcode == "PUSHFRAME" and instrs[end + 1].opcode == "CALL":
+            return cls(instrs[index:end + 2])
+        return None
+
+    def link(self, labels: dict):
+        super().link(labels)
+        self.target: int = self.parts[-1].target
+
+    # The return goes after the fused instruction, so its index is stored.
+    def execute(self, state: 'MachineState'):
+        state.frame_stack.create_temp_frame()
+        for part in self.body:
+            part(state)
+        state.frame_stack.add_frame()
+        state.label_dict.store_index(self.index)
+        return self.target
+
+
+# Sequence of the data stack instructions PUSHS and POPS, as when passing the arguments through the stack.
+class StackSequence(Fused):
+    name = "STACK_SEQUENCE"
+
+    def __init__(self, parts: list):
+        super().__init__(parts)
+        self.steps = tuple((part.opcode == "PUSHS", part.ops[0]) for part in parts)
+
+    @classmethod
+    def match(cls, instrs: list, index: int):
+        end: int = index
+        while end < len(instrs) and instrs[end].opcode in ("PUSHS", "POPS"):
+            end += 1
+        if end - index >= 2:
+            return cls(instrs[index:end])
+        return None
+
+    def execute(self, state: 'MachineState'):
+        data_stack: 'DataStack' = state.data_stack
+        for push, operand in self.steps:
+            if push:
+                value = operand.get_value(state)
+                data_stack.push(value, operand.get_type(state))
+            else:
+                value, typ = data_stack.pop()
+                operand.set_value(state, value, typ)
+
+
+# Fused instructions in the order, in which they are matched.
+FUSIONS = (CallSequence, ArithJump, CompareJump, DefvarMove, StackSequence)
+
+
+# Class representing an argument with its type, index and value.
+# Escape sequences in string literals are replaced, unless the value was already decoded.
+class Argument:
+    def __init__(self, typ: str, value: str, index: int, unescape: bool = True):
+        if index < 1 or index > 3:
+            throw_error("Wrong xml format, argument index out of range\n", 32)
+        self.type = typ
+        self.index = index
+        if typ == "string" and value is None:
+            self.value = ""
+        elif typ == "string" and unescape:
+            self.value = decode_escapes(value)
+        else:
+            self.value = value
+
+    def get_value(self):
+        return self.value
+
+    def get_type(self):
+        return self.type
+
+    def get_index(self):
+        return self.index
+
+    # Creates the pre-decoded operand for the argument. Variables are split to their frame
+    # and interned name, literals are converted to their python values.
+    def compile(self):
+        if self.type == "var":
+            if self.value is None or self.value[2:3] != "@":
+                throw_error("Wrong xml format, variable name\n", 32)
+            frame: str = self.value[0:2]
+            name: str = sys.intern(self.value[3:])
+            if frame == "GF":
+                return GlobalVar(name)
+            elif frame == "LF":
+                return LocalVar(name)
+            elif frame == "TF":
+                return TempVar(name)
+            throw_error("Wrong xml format, variable frame\n", 32)
+        elif self.type == "int":
+            try:
+                return Constant(parse_int(self.value), INT)
+            except ValueError:
+                return InvalidInt()
+        elif self.type == "bool":
+            return Constant(self.value == "true", BOOL)
+        elif self.type == "nil":
+            return Constant(None, NIL)
+        elif self.type == "string":
+            return Constant(self.value, STRING)
+        elif self.type in ("label", "type"):
+            return Constant(self.value, TYPE_NAMES.index(self.type))
+        throw_error("Wrong xml format, argument type\n", 32)
+
+
+# Operand classes are the decoded form of arguments used during the execution. All of them provide
+# the same interface for reading and writing, literals can only be read.
+class Operand:
+    pass
+
+
+# Literal value, already converted to the type used by the frames.
+class Constant(Operand):
+    def __init__(self, value, typ: int):
+        self.value = value
+        self.type = typ
+
+    def get_value(self, state: 'MachineState'):
+        return self.value
+
+    def get_type(self, state: 'MachineState'):
+        return self.type
+
+    def get_type_undef(self, state: 'MachineState'):
+        return self.type
+
+    def set_value(self, state: 'MachineState', value, typ: int):
+        throw_error("Wrong types of arguments\n", 53)
+
+    def input_var(self, state: 'MachineState'):
+        throw_error("Wrong types of arguments\n", 53)
+
+    def get_chars(self, state: 'MachineState'):
+        return self.value
+
+    def get_buffer(self, state: 'MachineState'):
+        return None
+
+    def assign_slot(self, glob_slots: dict, loc_slots: dict):
+        return
+
+    # Checks whether the other operand is the same literal.
+    def is_same(self, other: 'Operand'):
+        return type(other) is type(self) and other.type == self.type and other.value == self.value
+
+
+# Integer literal in a wrong format, the error is reported only when its value is used.
+class InvalidInt(Constant):
+    def __init__(self):
+        super().__init__(None, INT)
+
+    def get_value(self, state: 'MachineState'):
+        throw_error("Wrong type of argument\n", 32)
+
+
+# Variable in the global frame, accessed by its slot in the frame.
+class GlobalVar(Operand):
+    def __init__(self, name: str):
+        self.name = name
+        self.slot: int = 0
+
+    # Gives the variable its slot, variables with the same name share the slot.
+    def assign_slot(self, glob_slots: dict, loc_slots: dict):
+        self.slot = glob_slots.setdefault(self.name, len(glob_slots))
+
+    def get_value(self, state: 'MachineState'):
+        return state.glob_frame.get_value(self.slot)
+
+    def get_type(self, state: 'MachineState'):
+        return state.glob_frame.get_type(self.slot)
+
+    def get_type_undef(self, state: 'MachineState'):
+        return state.glob_frame.get_type_undef(self.slot)
+
+    def set_value(self, state: 'MachineState', value, typ: int):
+        state.glob_frame.set_value(self.slot, value, typ)
+
+    def input_var(self, state: 'MachineState'):
+        state.glob_frame.input_var(self.slot)
+
+    def get_chars(self, state: 'MachineState'):
+        return state.glob_frame.get_chars(self.slot)
+
+    def get_buffer(self, state: 'MachineState'):
+        return state.glob_frame.get_buffer(self.slot)
+
+    # Checks whether the other operand is the same variable in the same frame.
+    def is_same(self, other: 'Operand'):
+        return type(other) is type(self) and other.name == self.name
+
+
+# Variable in the local frame, the frame is looked up at the time of the access.
+class LocalVar(GlobalVar):
+    def assign_slot(self, glob_slots: dict, loc_slots: dict):
+        self.slot = loc_slots.setdefault(self.name, len(loc_slots))
+
+    def get_value(self, state: 'MachineState'):
+        return state.frame_stack.loc_frame.get_value(self.slot)
+
+    def get_type(self, state: 'MachineState'):
+        return state.frame_stack.loc_frame.get_type(self.slot)
+
+    def get_type_undef(self, state: 'MachineState'):
+        return state.frame_stack.loc_frame.get_type_undef(self.slot)
+
+    def set_value(self, state: 'MachineState', value, typ: int):
+        state.frame_stack.loc_frame.set_value(self.slot, value, typ)
+
+    def input_var(self, state: 'MachineState'):
+        state.frame_stack.loc_frame.input_var(self.slot)
+
+    def get_chars(self, state: 'MachineState'):
+        return state.frame_stack.loc_frame.get_chars(self.slot)
+
+    def get_buffer(self, state: 'MachineState'):
+        return state.frame_stack.loc_frame.get_buffer(self.slot)
+
+
+# Variable in the temporary frame, the frame is looked up at the time of the access.
+class TempVar(LocalVar):
+    def get_value(self, state: 'MachineState'):
+        return state.frame_stack.temp_frame.get_value(self.slot)
+
+    def get_type(self, state: 'MachineState'):
+        return state.frame_stack.temp_frame.get_type(self.slot)
+
+    def get_type_undef(self, state: 'MachineState'):
+        return state.frame_stack.temp_frame.get_type_undef(self.slot)
+
+    def set_value(self, state: 'MachineState', value, typ: int):
+        state.frame_stack.temp_frame.set_value(self.slot, value, typ)
+
+    def input_var(self, state: 'MachineState'):
+        state.frame_stack.temp_frame.input_var(self.slot)
+
+    def get_chars(self, state: 'MachineState'):
+        return state.frame_stack.temp_frame.get_chars(self.slot)
+
+    def get_buffer(self, state: 'MachineState'):
+        return state.frame_stack.temp_frame.get_buffer(self.slot)
+
+
+# Class for the global frame, is inherited to the single frame class. Variables are stored in slots
+# assigned at load time, the frame holds a list of values and an array of their type tags, where MISSING
+# marks a variable not defined in the frame and UNDEF a defined variable without a value.
+class GlobalFrame:
+    init = True
+
+    def __init__(self, names: list):
+        self.names = names
+        self.values = [None] * len(names)
+        self.types = bytearray(len(names))
+
+    # Creates a new undefined value
+    def input_var(self, slot: int):
+        if self.types[slot] != MISSING:
+            throw_error("The variable already exist in the frame\n", 52)
+        self.types[slot] = UNDEF
+
+    # Sets the variable to given value
+    def set_value(self, slot: int, value, typ: int):
+        if self.types[slot] == MISSING:
+            throw_error("Variable does not exist\n", 54)
+        self.values[slot] = value
+        self.types[slot] = typ
+
+    # Gets value of given variable, the string buffer is read as its flat text
+    def get_value(self, slot: int):
+        typ: int = self.types[slot]
+        if typ <= UNDEF:
+            if typ == BUFFER:
+                return self.values[slot].flat()
+            if typ == MISSING:
+                throw_error("Variable does not exist\n", 54)
+            throw_error("Variable is not initialized\n", 56)
+        return self.values[slot]
+
+    # Gets type of given variable, if is the variable undefined, throws error
+    def get_type(self, slot: int):
+        typ: int = self.types[slot]
+        if typ <= UNDEF:
+            if typ == BUFFER:
+                return STRING
+            if typ == MISSING:
+                throw_error("Variable does not exist\n", 54)
+            throw_error("Variable is not initialized\n", 56)
+        return typ
+
+    # Gets value of given variable for indexing and length, the string buffer is returned without flattening
+    def get_chars(self, slot: int):
+        typ: int = self.types[slot]
+        if typ <= UNDEF:
+            if typ == BUFFER:
+                return self.values[slot]
+            if typ == MISSING:
+                throw_error("Variable does not exist\n", 54)
+            throw_error("Variable is not initialized\n", 56)
+        return self.values[slot]
+
+    # Gets the string buffer of a string variable to be changed in place, the string is converted to the buffer
+    # on the first change. For a variable of another type None is returned.
+    def get_buffer(self, slot: int):
+        typ: int = self.types[slot]
+        if typ == BUFFER:
+            return self.values[slot]
+        if typ != STRING:
+            return None
+        buffer = new_buffer(self.values[slot])
+        self.values[slot] = buffer
+        self.types[slot] = BUFFER
+        return buffer
+
+    # Gets type of given variable even if it is uninitialized(used by type instruction)
+    def get_type_undef(self, slot: int):
+        typ: int = self.types[slot]
+        if typ == MISSING:
+            throw_error("Variable does not exist\n", 54)
+        return typ
+
+    # Checks whether the variable is in the frame
+    def is_in_frame(self, slot: int):
+        return self.types[slot] != MISSING
+
+    # Prints the variables of the frame, an undefined frame has none.
+    def print_frame(self):
+        if self.init is not True:
+            return
+        for slot in range(len(self.names)):
+            typ: int = self.types[slot]
+            if typ == UNDEF:
+                stderr.write(self.names[slot] + " is not initialized\n")
+            elif typ != MISSING:
+                stderr.write(self.names[slot] + " has the value " + to_text(self.get_value(slot), self.get_type(slot)) +
+                             " ane type " + TYPE_NAMES[typ] + "\n")
+
+
+# Class for a single frame(both local and temporary frame) with a flag, if it is initialized.
+# The slots are allocated only for an initialized frame.
+class SingleFrame(GlobalFrame):
+    init = False
+
+    def __init__(self, names: list, init: bool = False):
+        if init:
+            super().__init__(names)
+            self.init = True
+        else:
+            self.names = names
+            self.values = list()
+            self.types = bytearray()
+
+    def is_init(self):
+        return self.init is True
+
+    def input_var(self, slot: int):
+        if self.is_init():
+            super().input_var(slot)
+        else:
+            throw_error("Frame is not defined\n", 55)
+
+    def set_value(self, slot: int, value, typ: int):
+        if self.is_init():
+            super().set_value(slot, value, typ)
+        else:
+            throw_error("Frame is not defined\n", 55)
+
+    def get_value(self, slot: int):
+        if self.is_init():
+            return super().get_value(slot)
+        else:
+            throw_error("Frame is not defined\n", 55)
+
+    def get_type(self, slot: int):
+        if self.is_init():
+            return super().get_type(slot)
+        else:
+            throw_error("Frame is not defined\n", 55)
+
+    def get_type_undef(self, slot: int):
+        if self.is_init():
+            return super().get_type_undef(slot)
+        else:
+            throw_error("Frame is not defined\n", 55)
+
+    def get_chars(self, slot: int):
+        if self.is_init():
+            return super().get_chars(slot)
+        else:
+            throw_error("Frame is not defined\n", 55)
+
+    # Errors of an undefined frame are reported by the usual access.
+    def get_buffer(self, slot: int):
+        if self.is_init():
+            return super().get_buffer(slot)
+        return None
+
+    # Removes all the variables of the initialized frame, so it can be used as a new one.
+    # The lists are changed in place to the given empty ones.
+    def clear(self, values: list, types: bytes):
+        self.values[:] = values
+        self.types[:] = types
+
+
+# Type tags of the variables of a sparse frame by their slots, a slot without a variable is MISSING.
+class SparseTypes(dict):
+    def __missing__(self, slot: int):
+        return MISSING
+
+
+# Single frame of a program with many local and temporary names. Values and type tags are kept
+# in dictionaries by the slots, so the frame holds only its own variables.
+class SparseFrame(SingleFrame):
+    def __init__(self, names: list, init: bool = False):
+        self.names = names
+        self.values = dict()
+        self.types = SparseTypes()
+        if init:
+            self.init = True
+
+    # The dictionaries are emptied, the given empty lists are used only by the frames with all the slots.
+    def clear(self, values: list, types: bytes):
+        self.values.clear()
+        self.types.clear()
+
+
+# Mutable string of a variable, which is appended to by CONCAT or changed by SETCHAR. The characters of latin-1
+# are kept as bytes, one byte each, which gives their count directly. The flat text is created only when the value
+# is read and it is kept until the next change, which sets it to None. A character out of latin-1 is not added,
+# the change returns False and it is done on the flat string, the next buffer of the string is a WideStringBuffer.
+class StringBuffer(bytearray):
+    def __init__(self, text: str):
+        super().__init__(text, "latin-1")
+        self.text = text
+
+    def __getitem__(self, index: int):
+        return chr(bytearray.__getitem__(self, index))
+
+    def set_char(self, index: int, char: str):
+        if char > "\xff":
+            return False
+        bytearray.__setitem__(self, index, ord(char))
+        self.text = None
+        return True
+
+    def append_text(self, text: str):
+        try:
+            self.extend(text.encode("latin-1"))
+        except UnicodeEncodeError:
+            return False
+        self.text = None
+        return True
+
+    def flat(self):
+        if self.text is None:
+            self.text = self.decode("latin-1")
+        return self.text
+
+
+# String buffer of a string with a character out of latin-1, it is a list of characters
+class WideStringBuffer(list):
+    def __init__(self, text: str):
+        super().__init__(text)
+        self.text = text
+
+    def set_char(self, index: int, char: str):
+        self[index] = char
+        self.text = None
+        return True
+
+    def append_text(self, text: str):
+        self.extend(text)
+        self.text = None
+        return True
+
+    def flat(self):
+        if self.text is None:
+            self.text = "".join(self)
+        return self.text
+
+
+# Creates the string buffer of the text, bytes are used unless the text has a character out of latin-1
+def new_buffer(text: str):
+    if text.isascii() or max(text) <= "\xff":
+        return StringBuffer(text)
+    return WideStringBuffer(text)
+
+
+# Class for a frame stack with local and temporary frame. Local and temporary frames share the slots
+# of the variables, so a pushed temporary frame is used as the local one without any change.
+# All undefined frames are one shared frame without slots. A discarded temporary frame is no longer
+# referenced, so it is cleared and kept in the bounded free list for the next CREATEFRAME.
+# A program with more than FRAME_SLOTS names uses sparse frames, which are empty when cleared,
+# the free list of the frames with all the slots is bounded by their size too.
+class FrameStack:
+    def __init__(self, names: list):
+        self.names = names
+        self.sparse: bool = len(names) > FRAME_SLOTS
+        self.pool: int = FRAME_POOL if self.sparse else min(FRAME_POOL, FRAME_POOL_SLOTS // max(len(names), 1))
+        self.stack = list()
+        self.free = list()
+        self.empty_values = list() if self.sparse else [None] * len(names)
+        self.empty_types = bytes(0 if self.sparse else len(names))
+        self.undefined = self.new_frame()
+        self.loc_frame = self.undefined
+        self.temp_frame = self.undefined
+
+    # Creates a new frame, only initialized frames have the slots.
+    def new_frame(self, init: bool = False):
+        return SparseFrame(self.names, init) if self.sparse else SingleFrame(self.names, init)
+
+    # Keeps the discarded frame for the reuse, unless it is the undefined one or the free list is full.
+    def release_frame(self, frame: 'SingleFrame'):
+        if frame is not self.undefined and len(self.free) < self.pool:
+            frame.clear(self.empty_values, self.empty_types)
+            self.free.append(frame)
+
+    def create_temp_frame(self):
+        self.release_frame(self.temp_frame)
+        if len(self.free) != 0:
+            self.temp_frame = self.free.pop()
+        else:
+            self.temp_frame = self.new_frame(True)
+
+    # Pushes a temporary frame to frame stack, local frame points to the top of the stack
+    def add_frame(self):
+        if not self.temp_frame.is_init():
+            throw_error("Temporary frame not defined\n", 55)
+        self.stack.append(self.temp_frame)
+        self.loc_frame = self.temp_frame
+        self.temp_frame = self.undefined
+
+    # Pops the frame from the stack to the temporary frame,  local frame points to the top of the stack
+    def remove_frame(self):
+        if not self.loc_frame.is_init():
+            throw_error("Local frame is not defined\n", 55)
+        self.release_frame(self.temp_frame)
+        self.temp_frame = self.loc_frame
+        self.stack.pop()
+        if len(self.stack) == 0:
+            self.loc_frame = self.undefined
+        else:
+            self.loc_frame = self.stack[-1]
+
+
+# Reader of the input for the READ instruction. The input is read in large blocks, which are decoded
+# and split to lines at once, so reading a line only takes the next one from the prepared list.
+# Lines end with \n, \r\n or a lone \r, as in the text mode of python.
+# Standard input is read by the blocks, which are available, so an interactive input works too.
+class InputReader:
+    def __init__(self, file, own: bool):
+        self.file = file
+        self.own = own
+        self.read = file.read1 if hasattr(file, "read1") else file.read
+        self.lines = list()
+        self.next: int = 0
+        self.rest: bytes = b""
+        self.eof: bool = False
+
+    # Returns the next line without the line ending, an empty string at the end of the input.
+    def read_line(self):
+        if self.next == len(self.lines) and not self.fill():
+            return ""
+        line: str = self.lines[self.next]
+        self.next += 1
+        return line
+
+    # Reads the next block with at least one whole line, returns False at the end of the input.
+    def fill(self):
+        while not self.eof:
+            data: bytes = self.read(INPUT_CHUNK)
+            if len(data) == 0:
+                self.eof = True
+                data = self.rest
+                self.rest = b""
+                if len(data) == 0:
+                    break
+            else:
+                data = self.rest + data
+                # \r at the end of the block can be the first half of \r\n, it waits for the next block.
+                end: int = len(data) - 1 if data.endswith(b"\r") else len(data)
+                cut: int = max(data.rfind(b"\n", 0, end), data.rfind(b"\r", 0, end))
+                if cut < 0:
+                    self.rest = data
+                    continue
+                self.rest = data[cut + 1:]
+                data = data[:cut + 1]
+
+            text: str = data.decode("utf-8", "replace")
+            if "\r" in text:
+                text = text.replace("\r\n", "\n").replace("\r", "\n")
+            self.lines = text.split("\n")
+            if text.endswith("\n"):
+                self.lines.pop()
+            self.next = 0
+            return True
+        return False
+
+    def close(self):
+        if self.own:
+            self.file.close()
+
+
+# Data stack of the values with their type tags. Tags are kept in a bytearray, integers in an array
+# of 64-bit integers and the other values in a list, so no tuple is created for a pushed value
+# and an integer takes no object. Integers out of the range of the array are kept in the list
+# with their own tag.
+class DataStack:
+    boxed_int = 0x80 | INT
+
+    def __init__(self):
+        self.types = bytearray()
+        self.ints = array("q")
+        self.values = list()
+
+    def push(self, value, typ: int):
+        if typ == INT:
+            try:
+                self.ints.append(value)
+            except OverflowError:
+                self.values.append(value)
+                typ = self.boxed_int
+        else:
+            self.values.append(value)
+        self.types.append(typ)
+
+    # Pops the value and its type from the top of the stack.
+    def pop(self):
+        types: bytearray = self.types
+        if len(types) == 0:
+            throw_error("Empty data stack\n", 56)
+        typ: int = types.pop()
+        if typ == INT:
+            return self.ints.pop(), INT
+        if typ == self.boxed_int:
+            return self.values.pop(), INT
+        return self.values.pop(), typ
+
+    # Pops the two values with their types, the value from the top of the stack is the second one.
+    # Two integers are popped directly.
+    def pop_pair(self):
+        types: bytearray = self.types
+        if len(types) < 2:
+            throw_error("Empty data stack\n", 56)
+        if types[-1] == INT and types[-2] == INT:
+            del types[-2:]
+            ints = self.ints
+            val2: int = ints.pop()
+            return ints.pop(), INT, val2, INT
+        val2, typ2 = self.pop()
+        val1, typ1 = self.pop()
+        return val1, typ1, val2, typ2
+
+    def clear(self):
+        del self.types[:]
+        del self.ints[:]
+        self.values.clear()
+
+
+# Class holding the whole state of the running program, it is the only argument of every executed instruction.
+class MachineState:
+    def __init__(self, glob_frame: 'GlobalFrame', frame_stack: 'FrameStack', label_dict: 'LabelDict', input_file):
+        self.glob_frame = glob_frame
+        self.frame_stack = frame_stack
+        self.label_dict = label_dict
+        self.data_stack = DataStack()
+        self.input_file = input_file
+
+    def close(self):
+        self.input_file.close()
+
+
+# Class for the label directory with the instruction counter and call stack. The counter gives only the start
+# of the execution, then the loop keeps it and the jumps return their targets.
+class LabelDict:
+    instruct_counter: int = 0
+
+    def __init__(self, labels: dict = None):
+        self.dict = dict() if labels is None else labels
+        self.call_stack = list()
+
+    def add_label(self, label: str, instr: int):
+        if label in self.dict.keys():
+            throw_error("The label already exists\n", 52)
+        self.dict[label] = instr - 1
+
+    def store_index(self, index: int):
+        self.call_stack.append(index)
+
+    def pop_index(self):
+        if len(self.call_stack) == 0:
+            throw_error("Empty call stack\n", 56)
+        return self.call_stack.pop()
+
+    def inc_counter(self):
+        self.instruct_counter += 1
+
+    def set_counter(self, nmbr: int):
+        self.instruct_counter = nmbr
+
+    def get_counter(self):
+        return self.instruct_counter
+
+
+# Counters of the execution statistics. They are updated by the counting variants of the frames, the frame
+# stack, the label dictionary and the data stack, which are used only when the statistics are requested,
+# so the usual execution does not pay for them. Counts of the instructions are taken from the counted loop.
+class Statistics:
+    def __init__(self, prog: 'Program', groups: list):
+        self.prog = prog
+        self.groups = groups
+        self.vars: int = 0
+        self.peak_vars: int = 0
+        self.peak_frames: int = 0
+        self.peak_calls: int = 0
+        self.peak_stack: int = 0
+        self.allocated_frames: int = 0
+        self.reused_frames: int = 0
+
+    def add_var(self):
+        self.vars += 1
+        if self.vars > self.peak_vars:
+            self.peak_vars = self.vars
+
+    # Removes the variables of a discarded frame.
+    def remove_vars(self, count: int):
+        self.vars -= count
+
+    # Returns the executions of the source instructions by their order, parts of a fused instruction
+    # are executed as many times as the fused one.
+    def executions(self):
+        executed = dict()
+        for instruct, count in zip(self.prog.instr_list, self.prog.counts):
+            for part in instruct.parts if isinstance(instruct, Fused) else (instruct,):
+                if part.opcode not in UNCOUNTED_OPCODES:
+                    executed[part.order] = executed.get(part.order, 0) + count
+        return executed
+
+    # Writes the values of the groups in the given order, all groups if none were given.
+    def write(self, file):
+        executed = self.executions()
+        for group in self.groups or STATS_GROUPS:
+            if group == "--insts":
+                file.write("insts %d\nbytes %d\n" % (sum(executed.values()), output.written))
+            elif group == "--vars":
+                file.write("vars %d\n" % self.peak_vars)
+            elif group == "--frames":
+                file.write("frames %d\ncalls %d\nallocated %d\nreused %d\n" %
+                           (self.peak_frames, self.peak_calls, self.allocated_frames, self.reused_frames))
+            elif group == "--stack":
+                file.write("stack %d\n" % self.peak_stack)
+            elif group == "--hot":
+                hot: int = 0
+                for order, count in sorted(executed.items()):
+                    if count > executed.get(hot, 0):
+                        hot = order
+                file.write("hot %d\n" % hot)
+
+
+# Frame counting its initialized variables, used as the first base class of the counting frames.
+class CountingFrame:
+    initialized: int = 0
+
+    def set_value(self, slot: int, value, typ: int):
+        undefined: bool = self.init is True and self.types[slot] == UNDEF
+        super().set_value(slot, value, typ)
+        if undefined:
+            self.initialized += 1
+            self.stats.add_var()
+
+
+class CountingGlobalFrame(CountingFrame, GlobalFrame):
+    def __init__(self, names: list, stats: 'Statistics'):
+        super().__init__(names)
+        self.stats = stats
+
+
+class CountingSingleFrame(CountingFrame, SingleFrame):
+    def __init__(self, names: list, init: bool, stats: 'Statistics'):
+        super().__init__(names, init)
+        self.stats = stats
+
+    def clear(self, values: list, types: bytes):
+        super().clear(values, types)
+        self.initialized = 0
+
+
+class CountingSparseFrame(CountingSingleFrame, SparseFrame):
+    pass
+
+
+# Frame stack keeping the peak depth, the count of the variables in the discarded temporary frames
+# and the counts of the allocated and reused frames.
+class CountingFrameStack(FrameStack):
+    def __init__(self, names: list, stats: 'Statistics'):
+        self.stats = stats
+        super().__init__(names)
+
+    def new_frame(self, init: bool = False):
+        if init:
+            self.stats.allocated_frames += 1
+        if self.sparse:
+            return CountingSparseFrame(self.names, init, self.stats)
+        return CountingSingleFrame(self.names, init, self.stats)
+
+    def create_temp_frame(self):
+        discarded: int = self.temp_frame.initialized
+        allocated: int = self.stats.allocated_frames
+        super().create_temp_frame()
+        self.stats.remove_vars(discarded)
+        if self.stats.allocated_frames == allocated:
+            self.stats.reused_frames += 1
+
+    def add_frame(self):
+        super().add_frame()
+        if len(self.stack) > self.stats.peak_frames:
+            self.stats.peak_frames = len(self.stack)
+
+    def remove_frame(self):
+        discarded: int = self.temp_frame.initialized
+        super().remove_frame()
+        self.stats.remove_vars(discarded)
+
+
+# Label dictionary keeping the peak depth of the call stack.
+class CountingLabelDict(LabelDict):
+    def __init__(self, labels: dict, stats: 'Statistics'):
+        super().__init__(labels)
+        self.stats = stats
+
+    def store_index(self, index: int):
+        super().store_index(index)
+        if len(self.call_stack) > self.stats.peak_calls:
+            self.stats.peak_calls = len(self.call_stack)
+
+
+# Data stack keeping its peak size, only push makes the stack bigger.
+class CountingStack(DataStack):
+    def __init__(self, stats: 'Statistics'):
+        super().__init__()
+        self.stats = stats
+
+    def push(self, value, typ: int):
+        super().push(value, typ)
+        if len(self.types) > self.stats.peak_stack:
+            self.stats.peak_stack = len(self.types)
+
+
+# Checks whether the arguments are the same value. If the parameter typ is given
+# also checks if the arguments are the given type.
+def check_type(arg1: 'Operand', arg2: 'Operand', state: 'MachineState', typ: int = MISSING):
+    typ1: int = arg1.get_type(state)
+    typ2: int = arg2.get_type(state)
+
+    if typ == MISSING:
+        return typ1 == typ2
+    else:
+        return (typ1 == typ2) and (typ2 == typ)
+
+
+# Replaces the escape sequences \\ddd in the string by the characters.
+def decode_escapes(text: str):
+    if "\\" not in text:
+        return text
+    return get_format("escape").sub(lambda x: chr(int(x[1])), text)
+
+
+compiled_formats = dict()
+
+
+# Returns the compiled regular expression of the format, re is imported only by the programs reading
+# the input or containing the escape sequences.
+def get_format(name: str):
+    pattern = compiled_formats.get(name)
+    if pattern is None:
+        import re
+        pattern = compiled_formats[name] = re.compile(FORMATS[name])
+    return pattern
+
+
+# Imports the xml parser, the programs taken from the compiled program cache don't need it.
+def import_xml():
+    global ET
+    if ET is None:
+        import xml.etree.ElementTree as ET
+
+
+# Converts the value to its textual form used by the output instructions, nil is printed as an empty string.
+def to_text(value, typ: int):
+    if typ == STRING:
+        return value
+    elif typ == INT:
+        return str(value)
+    elif typ == BOOL:
+        return "true" if value else "false"
+    return ""
+
+
+# Converts the integer literal (decimal, hexadecimal or octal) to an int, raises ValueError on a wrong format.
+def parse_int(text: str):
+    if text is None:
+        raise ValueError
+    digits: str = text.strip()
+    sign: int = 1
+    if digits[:1] in ("+", "-"):
+        if digits[0] == "-":
+            sign = -1
+        digits = digits[1:]
+    base: int = 10
+    if digits[:2] in ("0x", "0X"):
+        base = 16
+        digits = digits[2:]
+    elif digits[:2] in ("0o", "0O"):
+        base = 8
+        digits = digits[2:]
+    if not digits.isalnum():
+        raise ValueError
+    return sign * int(digits, base)
+
+
+# Buffered writer of the program output. The text is collected and written to the binary stream in bulk,
+# when the buffer reaches its limit, at the end of each line for the "line" policy or only at the exit
+# for the "exit" policy. Output to stderr must be preceded by flushing the buffer to keep the order.
+class OutputWriter:
+    def __init__(self, stream, policy: str = ""):
+        self.stream = stream
+        self.parts = list()
+        self.size: int = 0
+        self.limit: int = OUTPUT_LIMIT
+        self.line: bool = False
+        self.written: int = 0
+        self.set_policy(policy)
+
+    # Sets the flush policy, without a policy the output is line buffered only for a terminal.
+    def set_policy(self, policy: str):
+        if policy == "":
+            policy = "line" if self.stream.isatty() else "size"
+        self.limit = sys.maxsize if policy == "exit" else OUTPUT_LIMIT
+        self.line = policy == "line"
+
+    def write(self, text: str):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.limit or (self.line and "\n" in text):
+            self.flush()
+
+    def flush(self):
+        if self.size == 0 and len(self.parts) == 0:
+            return
+        data: bytes = "".join(self.parts).encode("utf-8", "surrogatepass")
+        self.parts.clear()
+        self.size = 0
+        self.written += len(data)
+        try:
+            self.stream.write(data)
+            self.stream.flush()
+        except OSError:
+            throw_error("Couldn't write the output\n", 12)
+
+
+# Error exiting the interpret with the return value, raised by throw_error. Its message is written to the stderr
+# by report_error where the run ends, so the loading of the source can keep the error and report it later.
+class InterpretError(SystemExit):
+    def __init__(self, message: str, number: int):
+        super().__init__(number)
+        self.message = message
+
+
+# Prints the message of the error to the stderr after the output written before the error.
+def report_error(error: 'InterpretError'):
+    output.flush()
+    stderr.write(error.message)
+
+
+# Exits the program with the given return value, the error message is printed to the stderr.
+def throw_error(message: str, number: int, instr: 'Instruction' = None):
+    if instr is not None:
+        message = "Instruction: " + instr.opcode + " " + str(instr.order) + "\n" + message
+    raise InterpretError(message, number)
+
+
+# Program options beside the source and input file.
+class Options:
+    def __init__(self):
+        self.cache = True
+        self.flush = ""
+        self.level = DEFAULT_OPT_LEVEL
+        self.fusion_stats = None
+        self.profile = None
+        self.stats = None
+        self.groups = list()
+        self.batch = None
+        self.serve = None
+        self.tier = TIER_THRESHOLD
+        self.compile = False
+        self.type_errors = None
+
+
+# Parse the program arguments.
+def parse_arguments():
+    s_file = sys.stdin
+    i_file = sys.stdin
+    options = Options()
+    args = sys.argv[1:]
+
+    if len(args) == 0:
+        throw_error("Wrong program arguments\n", 10)
+    if "--help" in args:
+        if len(args) != 1:
+            throw_error("Wrong program arguments\n", 10)
+        print("Usage: interpret.py [--input=\"filename\"] [--source=\"filename\"] [--no-cache] [--flush=policy] [-O0|-O1|-O2]")
+        print("\t\t [--tier=N] [--type-errors=file] [--fusion-stats=file] [--profile=file] [--stats=file [--insts] [--vars] [--frames] [--stack] [--hot]]")
+        print("\t interpret.py --compile [--source=\"filename\"] [-O0|-O1|-O2]")
+        print("\t interpret.py --batch=\"filename\" [--no-cache] [-O0|-O1|-O2]")
+        print("\t interpret.py --serve=\"socket\"")
+        print("\t interpret.py [--help]")
+        print("Program takes the source code (expected in an xml format) of IPPcode22 and executes it")
+        print("\t --source  -  defines a file from which the source code will be taken,\n\t"
+              " else the source code will be taken from the standard input.\n\t"
+              "At least one of the  arguments (sourcefile, inputfile) must be given")
+        print("\t --input  -  defines a file from which the input code (for READ instruction) will be taken,\n\t"
+              " else the input code will be taken from the standard input.\n\t"
+              "At least one of the  arguments (sourcefile, inputfile) must be given")
+        print("\t --no-cache  -  the loaded program is not taken from or stored to the compiled program cache\n\t"
+              " (directory given by IPP_CACHE_DIR, else ~/.cache/ipp-interpret)")
+        print("\t --flush  -  when the program output is written: exit (only at the end), size (when 64k characters\n\t"
+              " are collected, default) or line (after each line, default for a terminal)")
+        print("\t -O0, -O1, -O2  -  optimization level of the loaded program: none, jump threading with removal of\n\t"
+              " the unreachable code and labels, fusion of instruction sequences (default), and also folding\n\t"
+              " of constants, removal of redundant moves and the instructions without the type checks\n\t"
+              " for the types proven by the type inference")
+        print("\t --tier  -  number of executions of a basic block, after which it is compiled to a python function\n\t"
+              " (default 100), 0 disables the compilation. Compiled blocks are used only by the runs without\n\t"
+              " the statistics and the profile. A program compiled by --compile is run by its module at any --tier")
+        print("\t --compile  -  compiles the program to a python module in the cache, a state machine of its basic\n\t"
+              " blocks compiled to functions, which runs the program in the next runs of the same source at the same\n\t"
+              " optimization level instead of the interpretation. The program is not executed")
+        print("\t --type-errors  -  writes to the file the instructions, which always fail with the wrong types\n\t"
+              " of arguments (53) when they are reached, as found by the type inference before the execution")
+        print("\t --fusion-stats  -  writes to the file, which fused instructions were created and how many times\n\t"
+              " they were executed")
+        print("\t --profile  -  writes the execution counts and times of the instructions, opcodes and label regions\n\t"
+              " to the file as json and as a text report to the file with the .txt suffix")
+        print("\t --stats  -  writes the statistics of the execution to the file, the groups are written in the given\n\t"
+              " order, all of them if none is given: --insts executed instructions (without LABEL, DPRINT and BREAK)\n\t"
+              " and bytes written, --vars peak number of initialized variables in all frames, --frames peak depth\n\t"
+              " of the frame stack and of the call stack and the counts of the allocated and reused frames,\n\t"
+              " --stack peak size of the data stack, --hot order of the most executed instruction.\n\t"
+              " Instructions are counted as executed after the optimization.")
+        print("\t --batch  -  runs the jobs listed in the file, each line has the source, input and output file\n\t"
+              " separated by tabs. Jobs run in a pool of processes, each source is parsed once. The output\n\t"
+              " of a job is written to its output file, the error output and the exit code to the files with\n\t"
+              " the suffix replaced by .err and .rc, as a standalone run would produce them")
+        print("\t --serve  -  runs the server executing the programs sent by client.py to the unix socket, parsed\n\t"
+              " programs are kept in memory by the workers of the server")
+        print("\t --help  -  printing this help")
+        exit(0)
+
+    given = list()
+    for arg in args:
+        name: str = arg.partition('=')[0]
+        if name.startswith("-O"):
+            name = "-O"
+        if name in given:
+            throw_error("Wrong program arguments\n", 10)
+        given.append(name)
+
+        if arg.startswith("--source="):
+            s_file = arg.partition('=')[2]
+        elif arg.startswith("--input="):
+            i_file = arg.partition('=')[2]
+        elif arg == "--no-cache":
+            options.cache = False
+        elif arg.startswith("--flush=") and arg.partition('=')[2] in FLUSH_POLICIES:
+            options.flush = arg.partition('=')[2]
+        elif arg.startswith("-O") and arg[2:] in OPT_LEVELS:
+            options.level = int(arg[2:])
+        elif arg.startswith("--fusion-stats=") and arg.partition('=')[2] != "":
+            options.fusion_stats = arg.partition('=')[2]
+        elif arg.startswith("--profile=") and arg.partition('=')[2] != "":
+            options.profile = arg.partition('=')[2]
+        elif arg.startswith("--stats=") and arg.partition('=')[2] != "":
+            options.stats = arg.partition('=')[2]
+        elif arg in STATS_GROUPS:
+            options.groups.append(arg)
+        elif arg.startswith("--batch=") and arg.partition('=')[2] != "":
+            options.batch = arg.partition('=')[2]
+        elif arg.startswith("--type-errors=") and arg.partition('=')[2] != "":
+            options.type_errors = arg.partition('=')[2]
+        elif arg == "--compile":
+            options.compile = True
+        elif arg.startswith("--tier=") and arg.partition('=')[2].isdigit():
+            options.tier = int(arg.partition('=')[2])
+        elif arg.startswith("--serve=") and arg.partition('=')[2] != "":
+            options.serve = arg.partition('=')[2]
+        else:
+            throw_error("Wrong program arguments\n", 10)
+
+    if options.serve is not None:
+        if len(args) != 1:
+            throw_error("Wrong program arguments\n", 10)
+    elif options.batch is not None:
+        if s_file != sys.stdin or i_file != sys.stdin or options.fusion_stats is not None or \
+                options.profile is not None or options.stats is not None or "--tier" in given or \
+                options.compile or options.type_errors is not None:
+            throw_error("Wrong program arguments\n", 10)
+    elif options.compile:
+        if i_file != sys.stdin or not options.cache or options.fusion_stats is not None or \
+                options.profile is not None or options.stats is not None:
+            throw_error("Wrong program arguments\n", 10)
+    elif s_file == sys.stdin and i_file == sys.stdin:
+        throw_error("Wrong program arguments\n", 10)
+    if len(options.groups) != 0 and options.stats is None:
+        throw_error("Wrong program arguments\n", 10)
+    return i_file, s_file, options
+
+
+# Load the instructions from the source file, created program class is returned sorted and with loaded labels.
+# If the cache is used, the program is taken from the compiled program cache, when it has the same source
+# and was stored by the same version of the interpret. Otherwise it is parsed and stored in the cache.
+def get_instruction_tree(s_file, cache: bool = True):
+    file = open_source(s_file)
+    if cache and s_file == sys.stdin:
+        file = io.BytesIO(file.read())
+    try:
+        return read_program(file, cache)
+    finally:
+        close_source(file, s_file)
+
+
+# Loads the program from the opened source file, which has to be seekable when the cache is used.
+def read_program(file, cache: bool = True):
+    path = None
+    key: str = ""
+    if cache:
+        key = hash_source(file)
+        path = cache_path(key)
+        prog = load_cached_program(path, key)
+        if prog is not None:
+            prog.assign_slots()
+            prog.key = key
+            return prog
+
+    prog = parse_xml_stream(file)
+    prog.sort_instruct()
+    prog.load_labels()
+    if path is not None:
+        store_cached_program(path, key, prog)
+    prog.assign_slots()
+    prog.key = key
+    return prog
+
+
+# Opens the source file for binary reading.
+def open_source(s_file):
+    if s_file == sys.stdin:
+        return sys.stdin.buffer
+    try:
+        return open(s_file, "rb")
+    except OSError:
+        throw_error("Couldn't open the source file\n", 11)
+
+
+def close_source(file, s_file):
+    if s_file != sys.stdin:
+        file.close()
+
+
+# Returns a new sha256 hash of the data, hashlib is imported only by the runs using the cache or the server.
+def sha256(data: bytes = b""):
+    import hashlib
+    return hashlib.sha256(data)
+
+
+# Returns the sha256 of the rest of the source file and rewinds the file back.
+def hash_source(file):
+    start: int = file.tell()
+    digest = sha256()
+    chunk: bytes = file.read(STREAM_CHUNK)
+    while chunk:
+        digest.update(chunk)
+        chunk = file.read(STREAM_CHUNK)
+    file.seek(start)
+    return digest.hexdigest()
+
+
+# Creates the program from the whole xml tree of the source. Checks for the syntax error in the xml.
+def parse_xml(source: bytes):
+    import_xml()
+    root = None
+    try:
+        root = ET.fromstring(source)
+    except ET.ParseError:
+        throw_error("Wrong xml structure\n", 31)
+
+    check_program_element(root)
+    prog = Program()
+    for element in root:
+        load_instruction(prog, element)
+    return prog
+
+
+# Creates the program from the source file parsed incrementally, the instructions are created by the
+# ProgramBuilder as soon as their elements are closed. The first found error of the xml format is kept
+# by the builder and raised only after the rest of the document is checked for the syntax error,
+# so the error codes match the parsing of the whole tree.
+def parse_xml_stream(file):
+    import_xml()
+    builder = ProgramBuilder()
+    parser = ET.XMLParser(target=builder)
+    try:
+        chunk: bytes = file.read(STREAM_CHUNK)
+        while chunk:
+            parser.feed(chunk)
+            chunk = file.read(STREAM_CHUNK)
+        parser.close()
+    except ET.ParseError:
+        throw_error("Wrong xml structure\n", 31)
+
+    if builder.error is not None:
+        raise builder.error
+    return builder.prog
+
+
+# Target of the xml parser, which keeps only the element of the currently read instruction.
+# The instruction is loaded to the program when its element is closed and the element is dropped.
+class ProgramBuilder:
+    def __init__(self):
+        self.prog = Program()
+        self.depth: int = 0
+        self.instruct = None
+        self.arg = None
+        self.text = list()
+        self.error = None
+
+    def start(self, tag: str, attrib: dict):
+        self.depth += 1
+        if self.depth == 1:
+            self.error = catch_error(self.error, check_program_element, ET.Element(tag, attrib))
+        elif self.depth == 2:
+            self.instruct = ET.Element(tag, attrib)
+        elif self.depth == 3:
+            self.arg = ET.SubElement(self.instruct, tag, attrib)
+            self.text = list()
+        elif self.arg is not None:
+            # as in the whole tree, the text of an argument ends by the nested element
+            self.set_text()
+
+    def data(self, data: str):
+        if self.arg is not None:
+            self.text.append(data)
+
+    def end(self, tag: str):
+        if self.depth == 3 and self.arg is not None:
+            self.set_text()
+        elif self.depth == 2:
+            self.error = catch_error(self.error, load_instruction, self.prog, self.instruct)
+            self.instruct = None
+        self.depth -= 1
+
+    def set_text(self):
+        if len(self.text) != 0:
+            self.arg.text = "".join(self.text)
+        self.arg = None
+
+    def close(self):
+        return self.prog
+
+
+# Calls the function, if it ends with an error, the error is returned instead of exiting the interpret.
+# Once an error was found, the function is not called anymore.
+def catch_error(error, function, *args):
+    if error is not None:
+        return error
+    try:
+        function(*args)
+    except InterpretError as e:
+        return e
+    return None
+
+
+# Checks the root element of the xml source.
+def check_program_element(root):
+    if root.tag != "program":
+        throw_error("Wrong xml format, missing the element program\n", 32)
+    if root.attrib.get("language") != "IPPcode22":
+        throw_error("Wrong xml format, program attributes\n", 32)
+
+
+# Creates the instruction with its arguments from the xml element and adds it to the program.
+def load_instruction(prog: 'Program', element):
+    if element.tag != "instruction":
+        throw_error("Wrong xml format, missing element instruction\n", 32)
+
+    arg_keys = list(element.attrib.keys())
+    if ("opcode" not in arg_keys) or ("order" not in arg_keys) or len(arg_keys) != 2:
+        throw_error("Wrong xml format, instruction attributes", 32)
+    if not element.attrib["order"].isnumeric():
+        throw_error("Order is not a number\n", 32)
+    instruct = MakeInstruct.create(element.attrib["opcode"], int(element.attrib["order"]))
+    for child in element:
+        if child.tag[0:-1] != "arg" or "type" not in child.attrib.keys() or len(child.attrib.keys()) != 1:
+            throw_error("Wrong xml format, attributes of attribute", 32)
+
+        arg = Argument(child.attrib["type"], child.text, int(child.tag[-1]))
+        instruct.add_arg(arg)
+
+    prog.add_instruct(instruct)
+
+
+# Returns the path of the cache entry for the source with given hash.
+def cache_path(key: str):
+    directory = os.environ.get("IPP_CACHE_DIR")
+    if not directory:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        directory = os.path.join(base, "ipp-interpret")
+    return os.path.join(directory, key + "-" + INTERPRETER_VERSION + ".ippc")
+
+
+# Loads the program from the cache entry. If the entry is missing, stale or corrupted, None is returned.
+def load_cached_program(path: str, key: str):
+    try:
+        with open(path, "rb") as file:
+            magic, version, stored_key, checksum, payload = marshal.load(file)
+        if magic != CACHE_MAGIC or version != INTERPRETER_VERSION or stored_key != key or \
+                sha256(payload).digest() != checksum:
+            return None
+        return Program.deserialize(marshal.loads(payload))
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+
+# Stores the loaded program to the cache, failing to write the cache is not an error.
+def store_cached_program(path: str, key: str, prog: 'Program'):
+    payload: bytes = marshal.dumps(prog.serialize())
+    tmp: str = path + "." + str(os.getpid())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "wb") as file:
+            marshal.dump((CACHE_MAGIC, INTERPRETER_VERSION, key, sha256(payload).digest(), payload), file)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+# Returns the path of the module compiled from the source with the given hash at the optimization level.
+def compiled_path(key: str, level: int):
+    return os.path.splitext(cache_path(key))[0] + "-O" + str(level) + ".py"
+
+
+# State machine ending the module of the compiled program. The state is the index of the last executed
+# instruction, each basic block is one function returning the next state. An instruction following a resumed
+# one in the middle of its block is executed alone, until the next block starts. The output is taken from
+# the runtime at the start of each run, because the server and the batch mode replace it.
+COMPILED_RUN = """
+# Runs the program from the instruction counter of the state with the instructions of the loaded program.
+def run(state, instrs):
+    global output
+    output = runtime.output
+    table = [instr.execute for instr in instrs]
+    for start, block in BLOCKS.items():
+        table[start] = block(instrs)
+    end = len(table)
+    counter = state.label_dict.get_counter()
+    while counter < end:
+        jump = table[counter](state)
+        if jump is not None:
+            counter = jump
+        counter += 1
+"""
+
+
+# Returns the hash of the optimized instructions, the compiled module is used only for the same ones.
+def program_layout(prog: 'Program'):
+    layout = tuple((instr.get_code(), instr.order, tuple(part.get_code() for part in getattr(instr, "parts", ())))
+                   for instr in prog.instr_list)
+    return sha256(repr((layout, sorted(prog.labels.items()))).encode()).hexdigest()
+
+
+# Returns the names of the runtime used by the code of the compiled module and by the functions in it.
+# The output is left out, it is taken at the start of each run.
+def runtime_names(code):
+    names = set()
+    codes = [code]
+    while len(codes) != 0:
+        code = codes.pop()
+        names.update(name for name in code.co_names if name in globals() and name != "output")
+        codes.extend(const for const in code.co_consts if isinstance(const, type(code)))
+    return sorted(names)
+
+
+# Writes the module of the optimized program to the cache. For each basic block, the module has a function
+# creating the function of the block for the instructions of the program, and run executes the program
+# by the state machine of the blocks. The module imports the runtime of the interpret, which it uses.
+def store_compiled_program(prog: 'Program', level: int):
+    path: str = compiled_path(prog.key, level)
+    lines = list()
+    starts = list()
+    for start, end in prog.basic_blocks():
+        if prog.instr_list[start].opcode != "BREAK":
+            lines.append(BlockCompiler(prog.instr_list, start, end).source("block_" + str(start)))
+            starts.append(start)
+    lines.append("BLOCKS = {" + ", ".join("%d: block_%d" % (start, start) for start in starts) + "}")
+    lines.append(COMPILED_RUN)
+    names = runtime_names(compile("\n".join(lines), path, "exec"))
+    header = ["# Program compiled by interpret.py " + INTERPRETER_VERSION + " from the source with the hash",
+              "# " + prog.key + " at the optimization level " + str(level) + ".",
+              "import " + __name__ + " as runtime"]
+    if len(names) != 0:
+        header.append("from " + __name__ + " import " + ", ".join(names))
+    header += ["", "VERSION = " + repr(INTERPRETER_VERSION), "LAYOUT = " + repr(program_layout(prog)), "", ""]
+    source: bytes = "\n".join(header + lines).encode()
+
+    tmp: str = path + "." + str(os.getpid())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "wb") as file:
+            file.write(source)
+        os.replace(tmp, path)
+    except OSError:
+        throw_error("Couldn't write the compiled program\n", 12)
+    compiled_code(path, source)
+
+
+# Returns the code of the compiled module. Its bytecode is kept in the file next to it,
+# the module is compiled again when it was changed or by another version of python.
+def compiled_code(path: str, source: bytes):
+    checksum: bytes = sha256(source).digest()
+    try:
+        with open(path + "c", "rb") as file:
+            magic, tag, stored, code = marshal.load(file)
+        if magic == CACHE_MAGIC and tag == sys.implementation.cache_tag and stored == checksum:
+            return code
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    code = compile(source, path, "exec")
+    tmp: str = path + "c." + str(os.getpid())
+    try:
+        with open(tmp, "wb") as file:
+            marshal.dump((CACHE_MAGIC, sys.implementation.cache_tag, checksum, code), file)
+        os.replace(tmp, path + "c")
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+    return code
+
+
+# Imports the compiled module of the program, which then runs the program instead of the interpretation.
+# The module is ignored when it is missing, invalid or compiled for other instructions.
+def load_compiled_program(prog: 'Program', level: int):
+    path: str = compiled_path(prog.key, level)
+    module = {"__name__": os.path.splitext(os.path.basename(path))[0], "__file__": path}
+    try:
+        with open(path, "rb") as file:
+            source: bytes = file.read()
+        exec(compiled_code(path, source), module)
+        if module["VERSION"] != INTERPRETER_VERSION or module["LAYOUT"] != program_layout(prog):
+            return
+        run = module["run"]
+    except Exception:
+        return
+    prog.compiled = run
+
+
+# Opens the input file for the READ instruction, the server gives the input directly as bytes.
+def open_input(i_file):
+    if isinstance(i_file, bytes):
+        return InputReader(io.BytesIO(i_file), True)
+    if i_file == sys.stdin:
+        return InputReader(sys.stdin.buffer, False)
+    try:
+        return InputReader(open(i_file, "rb"), True)
+    except OSError:
+        throw_error("Couldn't open the input file\n", 11)
+
+
+# Create global frame, frame stack, create and initialize label directory and execute the loaded program.
+# When statistics or the profile are requested, the executions are counted (and timed for the profile)
+# by a separate loop and the results are written even if the program exits.
+def execute_prog(prog, i_file, options: 'Options' = None):
+    stats = None
+    if options is None or options.stats is None:
+        state = MachineState(GlobalFrame(prog.global_names), FrameStack(prog.local_names), LabelDict(prog.labels),
+                             open_input(i_file))
+    else:
+        stats = Statistics(prog, options.groups)
+        state = MachineState(CountingGlobalFrame(prog.global_names, stats),
+                             CountingFrameStack(prog.local_names, stats),
+                             CountingLabelDict(prog.labels, stats), open_input(i_file))
+        state.data_stack = CountingStack(stats)
+
+    if options is None or (options.fusion_stats is None and options.profile is None and stats is None):
+        if options is not None:
+            prog.tier_threshold = options.tier
+        prog.execute(state)
+    else:
+        try:
+            if options.profile is not None:
+                prog.execute_profiled(state)
+            else:
+                prog.execute_counted(state)
+        finally:
+            output.flush()
+            if options.fusion_stats is not None:
+                write_stats(options.fusion_stats, prog.write_fusion_stats)
+            if options.profile is not None:
+                write_stats(options.profile, prog.write_profile)
+                write_stats(sibling_path(options.profile, ".txt"), prog.write_profile_report)
+            if stats is not None:
+                write_stats(options.stats, stats.write)
+    state.close()
+    output.flush()
+
+
+# Returns the path of a file belonging to the given one, such as the text report of the profile.
+# The suffix of the path is replaced by the given one, or the suffix is added if the path already has it.
+def sibling_path(path: str, suffix: str):
+    sibling: str = os.path.splitext(path)[0] + suffix
+    return sibling if sibling != path else path + suffix
+
+
+# Writes the statistics by the given function to the file.
+def write_stats(stats_file: str, function):
+    try:
+        with open(stats_file, "w") as file:
+            function(file)
+    except OSError:
+        throw_error("Couldn't write the statistics file\n", 12)
+
+
+# Runs the function with the output and the error output captured, as if it was the whole run of the interpret.
+# Errors exiting the interpret end only the function, their code is returned. The returned tuple contains
+# the result of the function, the exit code, the output and the error output, both as bytes.
+def run_captured(function, *args):
+    global output, stderr
+    saved_output, saved_stderr = output, stderr
+    stream = io.BytesIO()
+    messages = io.StringIO()
+    output = OutputWriter(stream, "exit")
+    stderr = messages
+    result = None
+    code = 0
+    try:
+        try:
+            result = function(*args)
+        except Exception as e:
+            output.flush()
+            output.write(str(e) + "\n")
+            throw_error("Inner error\n", 99)
+    except SystemExit as e:
+        if isinstance(e, InterpretError):
+            report_error(e)
+        code = e.code
+    finally:
+        output.flush()
+        output, stderr = saved_output, saved_stderr
+    return result, code, stream.getvalue(), messages.getvalue().encode("utf-8", "backslashreplace")
+
+
+# Reads the manifest of the batch mode. Each nonempty line contains the source, the input and the output
+# path of one job separated by tabs.
+def read_manifest(manifest: str):
+    try:
+        with open(manifest, "r") as file:
+            lines = file.read().splitlines()
+    except OSError:
+        throw_error("Couldn't open the batch manifest\n", 11)
+
+    jobs = list()
+    for line in lines:
+        if line.strip() == "":
+            continue
+        fields = line.split("\t")
+        if len(fields) != 3 or "" in fields:
+            throw_error("Wrong format of the batch manifest\n", 10)
+        jobs.append(tuple(fields))
+    return jobs
+
+
+# Runs the jobs of the batch mode in a worker process. The sources were parsed by the parent, they are
+# given either serialized, or with the captured result of the failed parsing. Each worker loads
+# and optimizes a program, when it first runs a job with its source, and reuses it for the next jobs.
+class BatchWorker:
+    def __init__(self, sources: dict, level: int):
+        self.sources = sources
+        self.level = level
+        self.programs = dict()
+
+    def get_program(self, source: str):
+        prog = self.programs.get(source)
+        if prog is None:
+            prog = Program.deserialize(self.sources[source][0])
+            prog.assign_slots()
+            Optimizer(prog).run(self.level)
+            self.programs[source] = prog
+        return prog
+
+    # Runs the job and writes its results, returns False if they couldn't be written.
+    def run(self, job: tuple):
+        source, i_file, o_file = job
+        failure = self.sources[source][1]
+        if failure is None:
+            code, out, err = run_captured(execute_prog, self.get_program(source), i_file)[1:]
+        else:
+            code, out, err = failure
+        try:
+            with open(o_file, "wb") as file:
+                file.write(out)
+            with open(sibling_path(o_file, ".err"), "wb") as file:
+                file.write(err)
+            with open(sibling_path(o_file, ".rc"), "w") as file:
+                file.write(str(code))
+        except OSError:
+            return False
+        return True
+
+
+batch_worker = None
+
+
+def init_batch_worker(sources: dict, level: int):
+    global batch_worker
+    batch_worker = BatchWorker(sources, level)
+
+
+def run_batch_job(job: tuple):
+    return batch_worker.run(job)
+
+
+# Returns the number of the cores available to the interpret.
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# Runs the jobs of the manifest in a pool of processes, one for each available core. Each distinct source
+# is parsed only once, the errors of parsing are reported by all of its jobs.
+def run_batch(manifest: str, options: 'Options'):
+    from concurrent.futures import ProcessPoolExecutor     # only needed by the batch mode
+
+    jobs = read_manifest(manifest)
+    sources = dict()
+    for source, i_file, o_file in jobs:
+        if source not in sources:
+            prog, code, out, err = run_captured(get_instruction_tree, source, options.cache)
+            sources[source] = (prog.serialize(), None) if code == 0 else (None, (code, out, err))
+    if len(jobs) == 0:
+        return
+
+    workers: int = min(available_cores(), len(jobs))
+    chunk: int = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(workers, initializer=init_batch_worker, initargs=(sources, options.level)) as pool:
+        written = list(pool.map(run_batch_job, jobs, chunksize=chunk))
+    if not all(written):
+        throw_error("Couldn't write the output of the batch\n", 12)
+
+
+# Sends the message to the socket of the server or the client. Messages are python literals written
+# by marshal, preceded by their length in 4 bytes.
+def send_message(sock, message):
+    data: bytes = marshal.dumps(message)
+    sock.sendall(len(data).to_bytes(4, "big") + data)
+
+
+# Receives the message from the socket, None is returned if the connection was closed.
+def receive_message(sock):
+    header: bytes = receive_exactly(sock, 4)
+    if header is None:
+        return None
+    data: bytes = receive_exactly(sock, int.from_bytes(header, "big"))
+    if data is None:
+        return None
+    return marshal.loads(data)
+
+
+def receive_exactly(sock, size: int):
+    parts = list()
+    while size > 0:
+        part: bytes = sock.recv(min(size, STREAM_CHUNK))
+        if not part:
+            return None
+        parts.append(part)
+        size -= len(part)
+    return b"".join(parts)
+
+
+# Runs the requests of the server in a worker process. Loaded and optimized programs are kept by the hash
+# of their source and the optimization level, the least recently used are dropped. The failed loading
+# is kept too, so it is reported without parsing the source again.
+class ServerWorker:
+    def __init__(self):
+        self.programs = dict()
+
+    # Returns the program of the request and the result of its failed loading, one of them is None,
+    # and whether the program was already loaded.
+    def get_program(self, request: dict):
+        level: int = request.get("level", DEFAULT_OPT_LEVEL)
+        cache: bool = request.get("cache", True)
+        source = request.get("source")
+        if "path" in request:
+            source, code, out, err = run_captured(read_source, request["path"])
+            if code != 0:
+                return None, (code, out, err), False
+        key: str = request["hash"] if source is None else sha256(source).hexdigest()
+
+        entry = self.programs.pop((key, level), None)
+        hit: bool = entry is not None
+        if entry is None:
+            prog, code, out, err = run_captured(load_program, source, key, level, cache)
+            entry = (prog, None if code == 0 else (code, out, err))
+        self.programs[(key, level)] = entry
+        if len(self.programs) > SERVER_PROGRAMS:
+            del self.programs[next(iter(self.programs))]
+        return entry[0], entry[1], hit
+
+    def run(self, request: dict):
+        prog, failure, hit = self.get_program(request)
+        if failure is None:
+            code, out, err = run_captured(execute_prog, prog, request.get("input", request.get("input_path")))[1:]
+        else:
+            code, out, err = failure
+        return {"code": code, "stdout": out, "stderr": err, "hit": hit}
+
+
+# Reads the whole source file.
+def read_source(s_file: str):
+    file = open_source(s_file)
+    try:
+        return file.read()
+    finally:
+        close_source(file, s_file)
+
+
+# Loads and optimizes the program from its source, without the source it is taken from the compiled
+# program cache by its hash.
+def load_program(source, key: str, level: int, cache: bool):
+    if source is not None:
+        prog = read_program(io.BytesIO(source), cache)
+    else:
+        prog = load_cached_program(cache_path(key), key)
+        if prog is None:
+            throw_error("Program not found in the cache\n", 11)
+        prog.assign_slots()
+    Optimizer(prog).run(level)
+    return prog
+
+
+server_worker = None
+
+
+def init_server_worker():
+    global server_worker
+    server_worker = ServerWorker()
+
+
+def run_server_request(request: dict):
+    return server_worker.run(request)
+
+
+# Counts of the requests of the server and the histogram of their latencies.
+class ServerMetrics:
+    def __init__(self, lock):
+        self.lock = lock
+        self.requests = dict.fromkeys(("source", "path", "hash"), 0)
+        self.errors: int = 0
+        self.hits: int = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency: float = 0.0
+
+    def record(self, request: dict, response: dict, latency: float):
+        kind: str = "hash" if "hash" in request else "path" if "path" in request else "source"
+        bucket: int = 0
+        while bucket < len(LATENCY_BUCKETS) and latency > LATENCY_BUCKETS[bucket]:
+            bucket += 1
+        with self.lock:
+            self.requests[kind] += 1
+            self.errors += response["code"] != 0
+            self.hits += response["hit"]
+            self.buckets[bucket] += 1
+            self.latency += latency
+
+    # Returns the metrics as text, one metric on each line, the histogram buckets are cumulative.
+    def text(self):
+        with self.lock:
+            lines = ["requests_%s %d" % item for item in self.requests.items()]
+            lines.append("requests %d" % sum(self.requests.values()))
+            lines.append("errors %d" % self.errors)
+            lines.append("cache_hits %d" % self.hits)
+            total: int = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), self.buckets):
+                total += count
+                lines.append("latency_ms_bucket{le=\"%s\"} %d" % (bound, total))
+            lines.append("latency_ms_sum %.3f" % self.latency)
+        return "\n".join(lines) + "\n"
+
+
+# Server executing the programs sent by the clients. Each connection is handled by its own thread, which
+# passes the requests to the pool of the worker processes. Requests contain either the source of the program,
+# the path of its source or the hash of the program in the compiled program cache, and either the input
+# or the path of the input. The response contains the exit code, the output and the error output.
+# The request {"metrics": True} returns the metrics of the server instead.
+class InterpretServer:
+    def __init__(self, pool, metrics: 'ServerMetrics'):
+        self.pool = pool
+        self.metrics = metrics
+
+    def answer(self, request: dict):
+        if request.get("metrics"):
+            return {"metrics": self.metrics.text()}
+        start: float = time.perf_counter()
+        try:
+            response = self.pool.submit(run_server_request, request).result()
+        except Exception as e:
+            response = {"code": 99, "stdout": b"", "stderr": (str(e) + "\nInner error\n").encode(), "hit": False}
+        self.metrics.record(request, response, (time.perf_counter() - start) * 1000)
+        return response
+
+    def handle(self, conn):
+        with conn:
+            try:
+                request = receive_message(conn)
+                while request is not None:
+                    send_message(conn, self.answer(request))
+                    request = receive_message(conn)
+            except (OSError, ValueError, EOFError, TypeError):
+                pass
+
+
+# Removes the socket at the path left by a previous server, any other file at the path is kept and reported.
+def remove_socket(socket_path: str):
+    import stat
+
+    try:
+        if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+            throw_error("The path of the socket is not a socket\n", 11)
+        os.remove(socket_path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        throw_error("Couldn't remove the old socket\n", 11)
+
+
+# Listens on the unix socket and serves the clients until the interpret is terminated. The workers are forked
+# before the server starts, so they are ready with all the modules imported.
+def serve(socket_path: str):
+    import signal
+    import socket
+    import threading
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    remove_socket(socket_path)
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    pool = ProcessPoolExecutor(available_cores(), context, initializer=init_server_worker)
+    pool.submit(int).result()                   # starts the workers
+    server = InterpretServer(pool, ServerMetrics(threading.Lock()))
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    bound: bool = False
+    signal.signal(signal.SIGTERM, lambda number, frame: exit(0))
+    try:
+        mask: int = os.umask(0o177)             # the socket is created for the user only
+        try:
+            listener.bind(socket_path)
+        finally:
+            os.umask(mask)
+        bound = True
+        listener.listen()
+        while True:
+            conn = listener.accept()[0]
+            threading.Thread(target=server.handle, args=(conn,), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    except OSError:
+        throw_error("Couldn't listen on the socket\n", 11)
+    finally:
+        listener.close()
+        if bound:
+            remove_socket(socket_path)
+        pool.shutdown(False, cancel_futures=True)
+
+
+output = OutputWriter(sys.stdout.buffer)
+
+
+# Runs the interpret by the program arguments, it is started by the interpret.py launcher.
+def main():
+    try:
+        run_interpret()
+    except InterpretError as error:
+        report_error(error)
+        raise
+    exit(0)
+
+
+# Runs the interpret in the mode given by the program arguments
+def run_interpret():
+    try:
+        in_file, src_file, opts = parse_arguments()
+        output.set_policy(opts.flush)
+        if opts.serve is not None:
+            serve(opts.serve)
+        elif opts.batch is not None:
+            run_batch(opts.batch, opts)
+        else:
+            program = get_instruction_tree(src_file, opts.cache)
+            if opts.type_errors is not None:
+                inference = TypeInference(program.instr_list)
+                inference.run()
+                write_stats(opts.type_errors, inference.write_errors)
+            Optimizer(program).run(opts.level)
+            if opts.compile:
+                store_compiled_program(program, opts.level)
+            else:
+                if opts.cache:
+                    load_compiled_program(program, opts.level)
+                execute_prog(program, in_file, opts)
+    except Exception as e:
+        output.flush()
+        print(e)
+        throw_error("Inner error\n", 99)